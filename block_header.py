@@ -0,0 +1,146 @@
+import hashlib
+import json
+import struct
+
+from merkle import leaves, merkle_proof, merkle_root
+
+# version, index, timestamp, previous hash, payload digest (Merkle root), producer digest, nonce
+HEADER_FORMAT = ">Bqd32s32s32sQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+HEADER_VERSION = 2  # 1: payload digest was sha256 of canonical JSON, 2: Merkle root
+NONCE_SIZE = 8  # The nonce is the last header field, so miners can pre-absorb the rest
+
+
+def hash_bytes(block_hash):
+    # Hex block hash -> 32 raw bytes ("0" / "" for the genesis parent become zeros)
+    return bytes.fromhex(block_hash.rjust(64, "0"))
+
+
+def payload_digest(payload, version=HEADER_VERSION):
+    # Merkle root over the transactions, so the header stays fixed-size and
+    # single transactions can be proven without shipping the whole block
+    if version == 1:
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()).digest()
+    return merkle_root(payload)
+
+
+def pack_header(index, timestamp, previous_hash, payload_hash, producer, nonce=0, version=HEADER_VERSION):
+    return struct.pack(
+        HEADER_FORMAT, version, index, timestamp, hash_bytes(previous_hash),
+        payload_hash, hashlib.sha256(str(producer).encode()).digest(), nonce,
+    )
+
+
+def legacy_block_hash(index, previous_hash, timestamp, payload, producer):
+    # Pre-binary format: sha256 of the concatenated field strings (nonce as producer for PoW)
+    return hashlib.sha256(f"{index}{previous_hash}{timestamp}{payload}{producer}".encode()).hexdigest()
+
+
+def hash_from_fields(fields):
+    # Recompute a block hash from BaseBlock.hash_fields() without the Block
+    # class, e.g. in a worker process
+    index, previous_hash, timestamp, payload, producer, nonce, version = fields
+    if version is None:
+        return legacy_block_hash(index, previous_hash, timestamp, payload, producer)
+    return hashlib.sha256(pack_header(index, timestamp, previous_hash, payload_digest(payload, version), producer, nonce, version)).hexdigest()
+
+
+class BaseBlock:
+    # Shared hashing for every Block class. Subclasses name the attributes that
+    # hold the payload and the producer (validator/delegate, None for PoW).
+    payload_field = "transactions"
+    producer_field = "validator"
+    legacy_hash = False  # Hash the pre-binary way: sha256 of the concatenated field strings
+    binary_version = HEADER_VERSION  # Header version to hash with; stored blocks keep the one they were saved with
+
+    @classmethod
+    def from_row(cls, row):
+        # Rebuild a stored block around its persisted hash without re-hashing it;
+        # is_chain_valid checks the stored hash the first time it reaches the block
+        block = cls.__new__(cls)
+        block.__dict__.update({key: value for key, value in row.items() if key != "header_version"})
+        if row.get("header_version") is None:
+            block.__dict__["legacy_hash"] = True
+        elif row["header_version"] != HEADER_VERSION:
+            block.__dict__["binary_version"] = row["header_version"]
+        return block
+
+    def __setattr__(self, name, value):
+        # Drop the cached hash whenever a header field is reassigned; in-place
+        # changes to the payload are only caught by has_valid_hash()
+        if name in ("index", "previous_hash", "timestamp", "nonce", "legacy_hash", self.producer_field):
+            self.__dict__.pop("_cached_hash", None)
+        elif name in (self.payload_field, "binary_version"):
+            self.__dict__.pop("_cached_hash", None)
+            self.__dict__.pop("_payload_hash", None)
+        object.__setattr__(self, name, value)
+
+    @property
+    def header_version(self):
+        # Stored with each block so loaders know which way it was hashed
+        return None if self.legacy_hash else self.binary_version
+
+    def payload_hash(self):
+        if "_payload_hash" not in self.__dict__:
+            self._payload_hash = payload_digest(getattr(self, self.payload_field), self.binary_version)
+        return self._payload_hash
+
+    @property
+    def merkle_root(self):
+        # None for headers that do not commit to a Merkle root (legacy and version 1)
+        return self.payload_hash().hex() if (self.header_version or 0) >= 2 else None
+
+    def inclusion_proof(self, transaction):
+        # Merkle path for the first occurrence of `transaction`, None if absent
+        payload = getattr(self, self.payload_field)
+        if self.merkle_root is None or transaction not in leaves(payload):
+            return None
+        return merkle_proof(payload, leaves(payload).index(transaction))
+
+    def header_bytes(self):
+        producer = getattr(self, self.producer_field) if self.producer_field else ""
+        return pack_header(self.index, self.timestamp, self.previous_hash, self.payload_hash(), producer, getattr(self, "nonce", 0), self.binary_version)
+
+    def calculate_hash(self):
+        if "_cached_hash" not in self.__dict__:
+            if self.legacy_hash:
+                self._cached_hash = self.calculate_legacy_hash()
+            else:
+                self._cached_hash = hashlib.sha256(self.header_bytes()).hexdigest()
+        return self._cached_hash
+
+    def recalculate_hash(self):
+        # Bypass the caches, e.g. to catch transactions that were mutated in place
+        self.__dict__.pop("_cached_hash", None)
+        self.__dict__.pop("_payload_hash", None)
+        return self.calculate_hash()
+
+    def has_valid_hash(self):
+        # Validation check: rebuilds the header from the current fields, because
+        # the caches only notice reassignment, not e.g. transactions[0] = "..."
+        return self.hash == self.recalculate_hash()
+
+    def calculate_legacy_hash(self):
+        producer = getattr(self, self.producer_field) if self.producer_field else self.nonce
+        return legacy_block_hash(self.index, self.previous_hash, self.timestamp, getattr(self, self.payload_field), producer)
+
+    def hash_fields(self):
+        # Plain, picklable inputs of calculate_hash, see hash_from_fields
+        nonce = getattr(self, "nonce", 0)
+        if self.producer_field:
+            producer = getattr(self, self.producer_field)
+        else:
+            producer = nonce if self.legacy_hash else ""
+        return (self.index, self.previous_hash, self.timestamp, getattr(self, self.payload_field), producer, nonce, self.header_version)
+
+
+def migrate_to_binary_headers(chain):
+    # Re-hash a legacy chain with binary headers, relinking previous_hash as we go.
+    # Only meaningful for PoS/PoW-free chains: re-hashing invalidates proof of work.
+    for i, block in enumerate(chain):
+        block.legacy_hash = False
+        block.binary_version = HEADER_VERSION
+        if i > 0:
+            block.previous_hash = chain[i - 1].hash
+        block.hash = block.calculate_hash()
+    return chain
@@ -0,0 +1,61 @@
+import threading
+
+import streamlit as st
+
+from cold_archive import ArchivedStore
+from paged_chain import PagedChain
+
+
+def block_to_row(block):
+    return {
+        "index": block.index,
+        "previous_hash": block.previous_hash,
+        "timestamp": block.timestamp,
+        "transactions": block.transactions,
+        "validator": block.validator,
+        "hash": block.hash,
+        "header_version": block.header_version,
+    }
+
+
+def load_blockchain(blockchain_class, block_class, db):
+    blockchain = blockchain_class()
+    # Only the newest blocks stay in memory; older ones are read from the store
+    # on demand, trusting their stored hash (see is_chain_valid)
+    chain = PagedChain(block_class, db)
+    if not len(chain):
+        chain.extend(blockchain.chain)  # Nothing stored yet: start from a fresh genesis
+    blockchain.chain = chain
+    if isinstance(db, ArchivedStore) and len(db.archive) and not db.broken_links():
+        # Only validated blocks get archived, so start checking above them
+        blockchain.verified_height = len(db.archive) - 1
+        blockchain.verified_hash = db.archive.last_hash()
+    return blockchain
+
+
+# Save blockchain state to the block store: only blocks above the last persisted
+# one are written, in one batch. The store is rewritten from scratch on explicit
+# compaction or when the stored tip is no longer on our chain (reorg).
+def save_blockchain(db, blockchain, compact=False):
+    chain = blockchain.chain
+    stored_tip = db.last()
+    start = 0
+    if stored_tip and not compact:
+        position = stored_tip["index"] - chain[0].index
+        if 0 <= position < len(chain) and chain[position].hash == stored_tip["hash"]:
+            start = position + 1
+        else:
+            compact = True
+    rows = [block_to_row(block) for block in chain[start:]]  # Read before rewriting: old blocks may be paged out
+    if compact:
+        db.replace_all(rows)  # Atomic: a crash keeps either the old ledger or the new one
+    else:
+        db.insert_multiple(rows)
+
+
+# One Blockchain per server process and store path, shared by every session;
+# st.session_state keeps only per-session widget state. Every change to the
+# chain is made while holding chain_lock, so one session writes at a time.
+@st.cache_resource
+def open_shared_blockchain(store_path, _load):
+    return _load(), threading.RLock()
@@ -0,0 +1,241 @@
+import bisect
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+from block_log import fsync_directory, write_durably
+from compression import Codec
+
+MAGIC = b"BLKSEG\x00\x01"
+SEGMENT_HEADER = struct.Struct(">QQII")  # first height, block count, blocks per chunk, chunk count
+CHUNK_ENTRY = struct.Struct(">QII")  # chunk offset, compressed length, crc32
+SEGMENT_BLOCKS = 1024  # Blocks sealed into one segment file
+CHUNK_BLOCKS = 64  # Blocks compressed together; a read unpacks one chunk, not the segment
+CACHED_CHUNKS = 8
+
+
+class ColdArchive:
+    # Old blocks sealed into immutable segment files under `directory`:
+    #   MAGIC | SEGMENT_HEADER | CHUNK_ENTRY per chunk | zlib-compressed JSON chunks
+    # manifest.json keeps one small summary per segment (heights, first and
+    # last hash, the first block's previous_hash and the file's sha256), so the
+    # links between segments can be checked without opening them.
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        os.makedirs(directory, exist_ok=True)
+        self.segments = []
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as file:
+                self.segments = json.load(file)
+        self._first_heights = [segment["first_height"] for segment in self.segments]  # For bisecting
+        self._codec = Codec("zlib", 9)
+        self._chunks = OrderedDict()  # (file, chunk number) -> decoded rows
+        self._heights = {}  # hash -> height, filled on the first height_of call
+        self._indexed = 0  # Heights already in _heights
+
+    def __len__(self):
+        return self.segments[-1]["last_height"] + 1 if self.segments else 0
+
+    def last_hash(self):
+        return self.segments[-1]["last_hash"] if self.segments else None
+
+    def seal(self, rows):
+        # Append `rows` (the blocks right after the archived ones) as new segments
+        for start in range(0, len(rows), SEGMENT_BLOCKS):
+            self._seal_segment(rows[start:start + SEGMENT_BLOCKS], len(self))
+
+    def _seal_segment(self, rows, first_height):
+        chunks = [
+            self._codec.encode(json.dumps(rows[start:start + CHUNK_BLOCKS], separators=(",", ":")).encode())
+            for start in range(0, len(rows), CHUNK_BLOCKS)
+        ]
+        offset = len(MAGIC) + SEGMENT_HEADER.size + CHUNK_ENTRY.size * len(chunks)
+        header = [MAGIC, SEGMENT_HEADER.pack(first_height, len(rows), CHUNK_BLOCKS, len(chunks))]
+        for chunk in chunks:
+            header.append(CHUNK_ENTRY.pack(offset, len(chunk), zlib.crc32(chunk)))
+            offset += len(chunk)
+        data = b"".join(header + chunks)
+
+        name = f"segment_{first_height:012d}.seg"
+        path = os.path.join(self.directory, name)
+        write_durably(f"{path}.tmp", data)
+        os.replace(f"{path}.tmp", path)
+        os.chmod(path, 0o444)  # Sealed: never written again
+
+        self.segments.append({
+            "file": name,
+            "first_height": first_height,
+            "last_height": first_height + len(rows) - 1,
+            "first_index": rows[0]["index"],
+            "last_index": rows[-1]["index"],
+            "first_previous_hash": rows[0]["previous_hash"],
+            "first_hash": rows[0]["hash"],
+            "last_hash": rows[-1]["hash"],
+            "sha256": hashlib.sha256(data).hexdigest(),
+        })
+        self._first_heights.append(first_height)
+        self._save_manifest()
+
+    def _save_manifest(self):
+        write_durably(f"{self.manifest_path}.tmp", json.dumps(self.segments, indent=1).encode())
+        os.replace(f"{self.manifest_path}.tmp", self.manifest_path)
+        fsync_directory(self.manifest_path)  # The segment and manifest renames are durable from here on
+
+    def get(self, height):
+        if not 0 <= height < len(self):
+            raise IndexError("archived height out of range")
+        segment = self.segments[bisect.bisect_right(self._first_heights, height) - 1]
+        chunk_number, position = divmod(height - segment["first_height"], CHUNK_BLOCKS)
+        return self._chunk(segment, chunk_number)[position]
+
+    def _chunk(self, segment, chunk_number):
+        key = (segment["file"], chunk_number)
+        if key in self._chunks:
+            self._chunks.move_to_end(key)
+            return self._chunks[key]
+        with open(os.path.join(self.directory, segment["file"]), "rb") as file:
+            file.seek(len(MAGIC) + SEGMENT_HEADER.size + CHUNK_ENTRY.size * chunk_number)
+            offset, length, checksum = CHUNK_ENTRY.unpack(file.read(CHUNK_ENTRY.size))
+            file.seek(offset)
+            chunk = file.read(length)
+        if zlib.crc32(chunk) != checksum:
+            raise ValueError(f"{segment['file']}: chunk {chunk_number} is corrupt")
+        rows = json.loads(self._codec.decode(chunk))
+        self._chunks[key] = rows
+        if len(self._chunks) > CACHED_CHUNKS:
+            self._chunks.popitem(last=False)
+        return rows
+
+    def all(self):
+        return [self.get(height) for height in range(len(self))]
+
+    def height_of(self, block_hash):
+        # Sealed segments never change, so only newly sealed heights are added
+        for height in range(self._indexed, len(self)):
+            self._heights.setdefault(self.get(height)["hash"], height)
+        self._indexed = len(self)
+        return self._heights.get(block_hash)
+
+    def broken_links(self, next_previous_hash=None):
+        # Segment boundaries whose link does not hold, from the summaries alone;
+        # `next_previous_hash` is the previous_hash of the first block after the archive
+        broken = []
+        for previous, segment in zip(self.segments, self.segments[1:]):
+            if segment["first_previous_hash"] != previous["last_hash"]:
+                broken.append(segment["first_height"])
+        if self.segments and next_previous_hash is not None and next_previous_hash != self.last_hash():
+            broken.append(len(self))
+        return broken
+
+    def verify(self):
+        # Files whose contents no longer match the checksum taken when they were sealed
+        corrupt = []
+        for segment in self.segments:
+            with open(os.path.join(self.directory, segment["file"]), "rb") as file:
+                if hashlib.sha256(file.read()).hexdigest() != segment["sha256"]:
+                    corrupt.append(segment["file"])
+        return corrupt
+
+
+class ArchivedStore:
+    # One block store over a ColdArchive (old heights) and a hot store such as
+    # BlockLog (recent heights), with the calls the Streamlit apps use.
+    # archive_old_blocks() moves whole segments' worth of old hot blocks into the archive.
+    # One lock serializes archiving with reads and writes from every session.
+    def __init__(self, hot, archive):
+        self.hot = hot
+        self.archive = archive
+        self._lock = threading.RLock()
+        self._skip = self._already_archived()
+
+    def _already_archived(self):
+        # Hot rows at the front that are also sealed, left behind if archiving
+        # was interrupted before the hot store was rewritten
+        skip = 0
+        while skip < len(self.hot) and self._is_archived(self.hot.get(skip)):
+            skip += 1
+        return skip
+
+    def _is_archived(self, row):
+        return bool(self.archive.segments) and row["index"] <= self.archive.segments[-1]["last_index"]
+
+    def __len__(self):
+        with self._lock:
+            return len(self.archive) + len(self.hot) - self._skip
+
+    def get(self, height):
+        with self._lock:
+            if height < len(self.archive):
+                return self.archive.get(height)
+            if height >= len(self):
+                raise IndexError("block height out of range")
+            return self.hot.get(height - len(self.archive) + self._skip)
+
+    def last(self):
+        with self._lock:
+            return self.get(len(self) - 1) if len(self) else None
+
+    def all(self):
+        with self._lock:
+            return self.archive.all() + self.hot.all()[self._skip:]
+
+    def height_of(self, block_hash):
+        with self._lock:
+            height = self.archive.height_of(block_hash)
+            if height is None:
+                hot_height = self.hot.height_of(block_hash)
+                if hot_height is not None and hot_height >= self._skip:
+                    height = len(self.archive) + hot_height - self._skip
+            return height
+
+    def insert_multiple(self, rows):
+        # Sealed blocks are never written to the hot store again (e.g. by a full
+        # rewrite); returns the ids (height + 1) of the rows actually inserted
+        with self._lock:
+            first = len(self) + 1
+            rows = [row for row in rows if not self._is_archived(row)]
+            self.hot.insert_multiple(rows)
+            return list(range(first, first + len(rows)))
+
+    def insert(self, row):
+        ids = self.insert_multiple([row])
+        return ids[0] if ids else None
+
+    def truncate(self):
+        # Drops the hot blocks only; sealed segments are never rewritten
+        with self._lock:
+            self.hot.truncate()
+            self._skip = 0
+
+    def replace_all(self, rows):
+        # Atomic rewrite of the hot blocks, see BlockLog.replace_all; rows that
+        # are already sealed stay in the archive
+        with self._lock:
+            self.hot.replace_all([row for row in rows if not self._is_archived(row)])
+            self._skip = 0
+
+    def archive_old_blocks(self, keep):
+        # Seal full segments of the oldest hot blocks, keeping at least `keep`
+        # hot. The segments and manifest are durable before the hot store is
+        # atomically replaced by its remaining blocks, so a crash in between
+        # only leaves sealed rows at the front of the hot store (see _skip).
+        with self._lock:
+            cold_count = (len(self.hot) - self._skip - keep) // SEGMENT_BLOCKS * SEGMENT_BLOCKS
+            if cold_count <= 0:
+                return 0
+            hot_rows = self.hot.all()[self._skip:]
+            self.archive.seal(hot_rows[:cold_count])
+            self.hot.replace_all(hot_rows[cold_count:])
+            self._skip = 0
+            return cold_count
+
+    def broken_links(self):
+        # Heights where the chain breaks at a segment boundary or where the hot store starts
+        with self._lock:
+            first_hot = self.hot.get(self._skip) if len(self.hot) > self._skip else None
+            return self.archive.broken_links(first_hot["previous_hash"] if first_hot else None)
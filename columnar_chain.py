@@ -0,0 +1,146 @@
+import json
+import sys
+import time
+import tracemalloc
+from array import array
+
+from block_header import HEADER_VERSION
+
+HASH_SIZE = 32
+
+
+class ColumnarChain:
+    # List-like replacement for Blockchain.chain that keeps blocks in typed
+    # columns instead of one Python object per block:
+    #   index/timestamp      array('q') / array('d')
+    #   hash                 32 raw bytes per block in one bytearray
+    #   previous_hash        not stored when it equals the previous block's hash
+    #   payload              JSON in one blob, located by an end-offset array
+    #   producer             small int into a table of distinct names
+    # Indexing hands out a fresh Block view; changes to a view are not written back.
+    def __init__(self, block_class, blocks=()):
+        self.block_class = block_class
+        self.indices = array('q')
+        self.timestamps = array('d')
+        self.hashes = bytearray()
+        self.payload_ends = array('Q')
+        self.payloads = bytearray()
+        self.producer_ids = array('I')
+        self.producers = []
+        self._producer_lookup = {}
+        self.versions = array('B')  # header_version, 0 for legacy string hashes
+        self.previous_overrides = {}  # height -> previous_hash that breaks the usual link
+        # PoW blocks only
+        self.pow = block_class.producer_field is None
+        self.nonces = array('Q')
+        self.bits = array('I')
+        for block in blocks:
+            self.append(block)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def _producer_id(self, producer):
+        if producer not in self._producer_lookup:
+            self._producer_lookup[producer] = len(self.producers)
+            self.producers.append(producer)
+        return self._producer_lookup[producer]
+
+    def append(self, block):
+        height = len(self)
+        if height == 0 or block.previous_hash != self.hash_at(height - 1):
+            self.previous_overrides[height] = block.previous_hash
+        self.indices.append(block.index)
+        self.timestamps.append(block.timestamp)
+        self.hashes += bytes.fromhex(block.hash)
+        self.payloads += json.dumps(getattr(block, self.block_class.payload_field), separators=(",", ":")).encode()
+        self.payload_ends.append(len(self.payloads))
+        self.versions.append(block.header_version or 0)
+        if self.pow:
+            self.nonces.append(block.nonce)
+            self.bits.append(block.bits or 0)
+        else:
+            self.producer_ids.append(self._producer_id(getattr(block, self.block_class.producer_field)))
+
+    def extend(self, blocks):
+        for block in blocks:
+            self.append(block)
+
+    def hash_at(self, height):
+        return self.hashes[height * HASH_SIZE:(height + 1) * HASH_SIZE].hex()
+
+    def previous_hash_at(self, height):
+        if height in self.previous_overrides:
+            return self.previous_overrides[height]
+        return self.hash_at(height - 1)
+
+    def payload_at(self, height):
+        start = self.payload_ends[height - 1] if height else 0
+        return json.loads(self.payloads[start:self.payload_ends[height]])
+
+    def _view(self, height):
+        # Fill the Block's attributes directly; going through __init__ would re-hash it
+        block = self.block_class.__new__(self.block_class)
+        fields = {
+            "index": self.indices[height],
+            "previous_hash": self.previous_hash_at(height),
+            "timestamp": self.timestamps[height],
+            self.block_class.payload_field: self.payload_at(height),
+            "hash": self.hash_at(height),
+        }
+        if not self.versions[height]:
+            fields["legacy_hash"] = True
+        elif self.versions[height] != HEADER_VERSION:
+            fields["binary_version"] = self.versions[height]
+        if self.pow:
+            fields["nonce"] = self.nonces[height]
+            fields["bits"] = self.bits[height] or None
+        else:
+            fields[self.block_class.producer_field] = self.producers[self.producer_ids[height]]
+        block.__dict__.update(fields)
+        return block
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._view(height) for height in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("chain index out of range")
+        return self._view(position)
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self._view(height)
+
+    def broken_links(self):
+        # Heights whose previous_hash does not match the block below, found
+        # without touching a single block (genesis is always listed)
+        return sorted(self.previous_overrides)
+
+    def column_bytes(self):
+        columns = [self.indices, self.timestamps, self.payload_ends, self.producer_ids, self.versions, self.nonces, self.bits]
+        return sum(column.itemsize * len(column) for column in columns) + len(self.hashes)
+
+
+if __name__ == "__main__":
+    from simple_blockchain6 import Block
+
+    count = 100_000
+    blocks = [Block(i, "0" if i == 0 else "", time.time(), [f"User{i % 50}: post {i}"], f"V{i % 5}") for i in range(count)]
+    for i in range(1, count):
+        blocks[i].previous_hash = blocks[i - 1].hash
+        blocks[i].hash = blocks[i].calculate_hash()
+
+    payload_bytes = sum(len(json.dumps(block.transactions, separators=(",", ":"))) for block in blocks)
+    tracemalloc.start()
+    columnar = ColumnarChain(Block, blocks)
+    columnar_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{count} blocks: columnar store {(columnar_memory - payload_bytes) / count:.0f} bytes/block overhead "
+          f"({columnar.column_bytes() / count:.0f} in columns) + payload blob")
+    print(f"list of Block objects: {sys.getsizeof(blocks[1]) + sys.getsizeof(blocks[1].__dict__)} bytes/block before fields and payload")
+
+    started = time.perf_counter()
+    assert columnar.broken_links() == [0]
+    print(f"link scan: {time.perf_counter() - started:.4f}s, latest block {columnar[-1].index} hash valid: {columnar[-1].hash == columnar[-1].calculate_hash()}")
@@ -0,0 +1,93 @@
+import lzma
+import zlib
+
+# The first byte of a stored body says how it was encoded. Plain JSON rows
+# start with "{", so bodies written before compression still decode.
+PLAIN = ord("{")
+ZLIB = ord("Z")
+ZLIB_DICT = ord("D")  # zlib primed with a shared dictionary
+LZMA = ord("X")
+METHODS = (None, "zlib", "lzma")
+DICTIONARY_SIZE = 32 * 1024  # zlib only looks back 32 KiB
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    # zlib matches against a dictionary as if it were data seen just before,
+    # so recent, representative encoded rows make a good one. Later bytes are
+    # cheaper to reference, hence the most recent samples go last.
+    distinct = list(dict.fromkeys(samples))
+    return b"".join(distinct)[-size:]
+
+
+class Codec:
+    def __init__(self, method=None, level=6, dictionary=None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown compression {method!r}, expected one of {METHODS}")
+        if dictionary and method != "zlib":
+            raise ValueError("A shared dictionary needs zlib compression")
+        self.method = method
+        self.level = level
+        self.dictionary = dictionary
+
+    def encode(self, body):
+        if self.method == "zlib" and self.dictionary:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+            return bytes([ZLIB_DICT]) + compressor.compress(body) + compressor.flush()
+        if self.method == "zlib":
+            return bytes([ZLIB]) + zlib.compress(body, self.level)
+        if self.method == "lzma":
+            return bytes([LZMA]) + lzma.compress(body, format=lzma.FORMAT_ALONE, preset=self.level)  # 13-byte header instead of xz's ~60
+        return body
+
+    def decode(self, data):
+        tag = data[0]
+        if tag == PLAIN:
+            return bytes(data)
+        if tag == ZLIB:
+            return zlib.decompress(data[1:])
+        if tag == ZLIB_DICT:
+            if not self.dictionary:
+                raise ValueError("Record was compressed with a shared dictionary that is not loaded")
+            decompressor = zlib.decompressobj(zdict=self.dictionary)
+            return decompressor.decompress(data[1:]) + decompressor.flush()
+        if tag == LZMA:
+            return lzma.decompress(data[1:], format=lzma.FORMAT_ALONE)
+        raise ValueError(f"Unknown record encoding {tag:#x}")
+
+
+if __name__ == "__main__":
+    import hashlib
+    import json
+    import random
+    import time
+
+    # Ratio and decode cost on rows shaped like the Streamlit apps' blocks
+    words = "decentralized networks empower freedom censorship resistant social media is the future blockchain ensures content integrity open source trustless".split()
+    rows = []
+    for i in range(2000):
+        posts = [f"User{random.randrange(100)}: '{' '.join(random.choices(words, k=8)).capitalize()}!'" for _ in range(random.randint(1, 4))]
+        rows.append({"index": i, "previous_hash": hashlib.sha256(b"%d" % (i - 1)).hexdigest(), "timestamp": time.time(),
+                     "transactions": posts, "validator": random.choice(["Alice", "Bob", "Charlie"]),
+                     "hash": hashlib.sha256(b"%d" % i).hexdigest(), "header_version": 1})
+    bodies = [json.dumps(row, separators=(",", ":")).encode() for row in rows]
+    raw_size = sum(map(len, bodies))
+    dictionary = train_dictionary(bodies[:200])
+    codecs = {
+        "none": Codec(),
+        "zlib 1": Codec("zlib", 1),
+        "zlib 6": Codec("zlib", 6),
+        "zlib 9": Codec("zlib", 9),
+        "zlib 6 + dictionary": Codec("zlib", 6, dictionary),
+        "lzma 6": Codec("lzma", 6),
+    }
+    print(f"{len(rows)} blocks, {raw_size / len(rows):.0f} JSON bytes/block")
+    for name, codec in codecs.items():
+        started = time.perf_counter()
+        encoded = [codec.encode(body) for body in bodies[200:]]
+        encode_time = time.perf_counter() - started
+        started = time.perf_counter()
+        assert [codec.decode(data) for data in encoded] == bodies[200:]
+        decode_time = time.perf_counter() - started
+        size = sum(map(len, encoded))
+        print(f"{name:20} ratio {sum(map(len, bodies[200:])) / size:5.2f}  {size / len(encoded):5.0f} B/block  "
+              f"encode {encode_time * 1e6 / len(encoded):6.1f} us  decode {decode_time * 1e6 / len(encoded):6.1f} us")
@@ -1,20 +1,82 @@
-from flask import Flask, request, jsonify
+import base64
+import binascii
+import json
+from flask import Flask, Response, request, jsonify, stream_with_context
 from simple_blockchain5 import Blockchain
 
+DEFAULT_PAGE_SIZE = 100  # Blocks per /chain page when the client does not ask for a limit
+MAX_PAGE_SIZE = 1000
+
 app = Flask(__name__)
 blockchain = Blockchain()
 
-@app.route('/chain', methods=['GET'])
-def get_chain():
-    chain_data = [{
+def block_to_dict(block):
+    return {
         'index': block.index,
         'previous_hash': block.previous_hash,
         'timestamp': block.timestamp,
         'transactions': block.transactions,
         'validator': block.validator,
         'hash': block.hash
-    } for block in blockchain.chain]
-    return jsonify({'length': len(blockchain.chain), 'chain': chain_data}), 200
+    }
+
+def encode_cursor(height, to, limit):
+    return base64.urlsafe_b64encode(json.dumps([height, to, limit]).encode()).decode()
+
+def decode_cursor(cursor):
+    height, to, limit = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return int(height), None if to is None else int(to), int(limit)
+
+# GET /chain?from=&to=&limit=  (heights, `to` inclusive) or /chain?cursor=
+# Returns at most `limit` blocks (DEFAULT_PAGE_SIZE when not given, never more
+# than MAX_PAGE_SIZE) and a next_cursor to continue, null on the last page.
+# The cursor keeps the page size; a `limit` sent with it takes precedence.
+@app.route('/chain', methods=['GET'])
+def get_chain():
+    try:
+        if 'cursor' in request.args:
+            start, to, limit = decode_cursor(request.args['cursor'])
+        else:
+            start = int(request.args.get('from', 0))
+            to = int(request.args['to']) if 'to' in request.args else None
+            limit = DEFAULT_PAGE_SIZE
+        limit = min(int(request.args.get('limit', limit)), MAX_PAGE_SIZE)
+    except (ValueError, TypeError, binascii.Error):
+        return jsonify({'message': 'Invalid from/to/limit/cursor'}), 400
+    if start < 0 or limit < 1 or (to is not None and to < start):
+        return jsonify({'message': 'Invalid from/to/limit/cursor'}), 400
+
+    length = len(blockchain.chain)
+    end = length if to is None else min(to + 1, length)
+    stop = min(start + limit, end)
+    chain_data = [block_to_dict(block) for block in blockchain.chain[start:stop]]
+    return jsonify({
+        'length': length,
+        'tip_hash': blockchain.get_latest_block().hash,
+        'from': start,
+        'chain': chain_data,
+        'next_cursor': encode_cursor(stop, to, limit) if stop < end else None
+    }), 200
+
+# GET /chain/stream?from=<height>: every block from `from` (default 0) up to
+# the tip at request time, one JSON object per line, produced as it is sent.
+# A client that was cut off resumes with from=<last index received + 1>.
+@app.route('/chain/stream', methods=['GET'])
+def stream_chain():
+    try:
+        start = int(request.args.get('from', 0))
+    except ValueError:
+        return jsonify({'message': 'Invalid from'}), 400
+    if start < 0:
+        return jsonify({'message': 'Invalid from'}), 400
+    length = len(blockchain.chain)
+
+    def generate():
+        for height in range(start, length):
+            yield json.dumps(block_to_dict(blockchain.chain[height])) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Chain-Length': str(length)})
 
 @app.route('/transaction', methods=['POST'])
 def add_transaction():
@@ -33,14 +95,7 @@ def mine_block():
 @app.route('/latest', methods=['GET'])
 def get_latest_block():
     latest_block = blockchain.get_latest_block()
-    return jsonify({
-        'index': latest_block.index,
-        'previous_hash': latest_block.previous_hash,
-        'timestamp': latest_block.timestamp,
-        'transactions': latest_block.transactions,
-        'validator': latest_block.validator,
-        'hash': latest_block.hash
-    }), 200
+    return jsonify(block_to_dict(latest_block)), 200
 
 @app.route('/stake', methods=['POST'])
 def stake_coins():
@@ -0,0 +1,61 @@
+import os
+import threading
+from collections import OrderedDict
+
+CACHED_ROWS = 2048  # Rows kept for windowed reads, least recently used dropped first
+
+
+class LedgerCache:
+    # Recently read rows of a block store, shared by every Streamlit session.
+    # The store's tip (height + hash) and file mtime are checked on every call;
+    # cached rows survive appends and are dropped when the chain was rewritten.
+    # Callers get rows they must not modify.
+    def __init__(self, store, path):
+        self.store = store
+        self.path = path  # File whose mtime is part of the cache key
+        self._lock = threading.Lock()
+        self._key = None
+        self._rows = OrderedDict()  # height -> row
+
+    def _current_key(self):
+        # The tip is read at the counted height, so a block appended by another
+        # session in between cannot pair one height with another block's hash
+        count = len(self.store)
+        tip = self.store.get(count - 1) if count else None
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        return count, tip["hash"] if tip else None, mtime
+
+    def _check(self):
+        # Drop the cached rows unless the store only grew on top of them
+        key = self._current_key()
+        if key == self._key:
+            return
+        if self._key and self._key[0] and not (key[0] >= self._key[0] and self.store.get(self._key[0] - 1)["hash"] == self._key[1]):
+            self._rows.clear()
+        self._key = key
+
+    def __len__(self):
+        with self._lock:
+            self._check()
+            return self._key[0]
+
+    def window(self, start, stop):
+        # Rows start..stop-1, reading from the store only the ones not cached
+        with self._lock:
+            self._check()
+            window = []
+            for height in range(max(0, start), min(stop, self._key[0])):
+                if height in self._rows:
+                    row = self._rows[height]
+                    self._rows.move_to_end(height)
+                else:
+                    row = self._rows[height] = self.store.get(height)
+                    if len(self._rows) > CACHED_ROWS:
+                        self._rows.popitem(last=False)
+                window.append(row)
+            return window
+
+    def height_of(self, block_hash):
+        # Height of the block with `block_hash`, None if there is none; answered
+        # by the store's hash index, never by parsing the whole ledger
+        return self.store.height_of(block_hash)
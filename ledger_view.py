@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import streamlit as st
+
+
+def _go_to(ledger_cache, height):
+    # Move the Page input to the page holding `height`, once; paging stays free afterwards
+    if height is None:
+        return
+    st.session_state.ledger_page = (len(ledger_cache) - 1 - height) // st.session_state.ledger_page_size + 1
+    st.session_state.ledger_target = height
+
+
+def _jump_to_height(ledger_cache):
+    height = st.session_state.ledger_jump_height
+    st.session_state.ledger_jump_height = None
+    _go_to(ledger_cache, height)
+
+
+def _jump_to_hash(ledger_cache):
+    block_hash = st.session_state.ledger_jump_hash.strip()
+    st.session_state.ledger_jump_hash = ""
+    height = ledger_cache.height_of(block_hash) if block_hash else None
+    st.session_state.ledger_hash_missing = bool(block_hash) and height is None
+    _go_to(ledger_cache, height)
+
+
+def _forget_target():
+    st.session_state.ledger_target = None
+
+
+def render_ledger(ledger_cache):
+    # Newest first, one page at a time: only the visible blocks are read and
+    # rendered. The jump inputs apply once and clear themselves.
+    total_blocks = len(ledger_cache)
+    if not total_blocks:
+        st.info("No blocks added yet!")
+        return
+
+    size_column, mode_column, height_column, hash_column = st.columns(4)
+    page_size = size_column.selectbox("Blocks per page:", [10, 25, 50, 100], key="ledger_page_size", on_change=_forget_target)
+    table_mode = mode_column.toggle("Compact table")
+    height_column.number_input("Jump to height:", min_value=0, max_value=total_blocks - 1, value=None, step=1,
+                               key="ledger_jump_height", on_change=_jump_to_height, args=(ledger_cache,))
+    hash_column.text_input("Jump to hash:", key="ledger_jump_hash", on_change=_jump_to_hash, args=(ledger_cache,))
+    if st.session_state.pop("ledger_hash_missing", False):
+        st.warning("No block with that hash.")
+
+    page_count = (total_blocks + page_size - 1) // page_size
+    if st.session_state.get("ledger_page", 1) > page_count:
+        st.session_state.ledger_page = page_count  # The ledger shrank (reorg) under this session
+    page = st.number_input("Page:", min_value=1, max_value=page_count, step=1, key="ledger_page", on_change=_forget_target)
+    target_height = st.session_state.get("ledger_target")
+
+    stop = total_blocks - (page - 1) * page_size
+    start = max(0, stop - page_size)
+    window = ledger_cache.window(start, stop)[::-1]
+    if table_mode:
+        st.dataframe([{
+            "height": stop - 1 - position,
+            "index": block["index"],
+            "time": datetime.fromtimestamp(block["timestamp"]),
+            "validator": block.get("validator"),
+            "transactions": len(block["transactions"]) if isinstance(block["transactions"], list) else 1,
+            "hash": block["hash"],
+            "previous hash": block["previous_hash"],
+        } for position, block in enumerate(window)], hide_index=True)
+    else:
+        for position, block in enumerate(window):
+            st.write(f"🔗 **Block {block['index']}**")
+            st.json(block, expanded=target_height in (None, stop - 1 - position))  # Jumps open only the target
+    st.caption(f"Page {page} of {page_count}: blocks {start}-{stop - 1} of {total_blocks}, newest first")
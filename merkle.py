@@ -0,0 +1,76 @@
+import hashlib
+import json
+
+# Leaves and inner nodes are hashed with different prefixes so a leaf can
+# never be passed off as an inner node (second-preimage protection).
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+
+def leaves(payload):
+    # A block payload is a list of transactions or, for genesis, a single value
+    return payload if isinstance(payload, list) else [payload]
+
+
+def leaf_hash(transaction):
+    encoded = json.dumps(transaction, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.sha256(LEAF_PREFIX + encoded).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level):
+    # Pair up nodes; an odd last node is promoted unchanged
+    paired = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        paired.append(level[-1])
+    return paired
+
+
+def merkle_root(payload):
+    level = [leaf_hash(transaction) for transaction in leaves(payload)]
+    if not level:
+        return EMPTY_ROOT
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_proof(payload, position):
+    """Sibling path from leaf `position` to the root.
+
+    Each step is [sibling_hash_hex, side] where side says whether the sibling
+    sits on the "left" or "right"; the list is JSON-serializable as is.
+    """
+    level = [leaf_hash(transaction) for transaction in leaves(payload)]
+    proof = []
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append([level[sibling].hex(), "left" if sibling < position else "right"])
+        level = _next_level(level)
+        position //= 2
+    return proof
+
+
+def verify_merkle_proof(transaction, proof, root):
+    # `root` may be raw bytes or hex, as stored on a block header
+    current = leaf_hash(transaction)
+    for sibling_hex, side in proof:
+        sibling = bytes.fromhex(sibling_hex)
+        current = node_hash(sibling, current) if side == "left" else node_hash(current, sibling)
+    return current == (bytes.fromhex(root) if isinstance(root, str) else root)
+
+
+class InclusionProofs:
+    # Mixin for the Blockchain classes: proofs against `self.chain` of BaseBlocks
+    def get_inclusion_proof(self, block_index, transaction):
+        # Merkle path proving `transaction` is in the block at `block_index` (None if it is not)
+        return self.chain[block_index].inclusion_proof(transaction)
+
+    def verify_inclusion_proof(self, transaction, proof, merkle_root):
+        # Needs only the block's Merkle root, not its transactions
+        return verify_merkle_proof(transaction, proof, merkle_root)
@@ -0,0 +1,156 @@
+import time
+
+import numpy as np
+
+from block_header import NONCE_SIZE, pack_header, payload_digest
+
+BATCH_SIZE = 65_536  # Candidate nonces hashed per vectorized pass
+
+# SHA-256 round constants and initial hash value (FIPS 180-4)
+K = np.array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+], dtype=np.uint32)
+H0 = np.array([
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+], dtype=np.uint32)
+
+
+def _rotr(x, n):
+    return (x >> np.uint32(n)) | (x << np.uint32(32 - n))
+
+
+def _compress(state, words):
+    # One SHA-256 compression over a batch: `state` is 8 uint32 columns of
+    # shape (n,), `words` is an (n, 16) uint32 message block.
+    w = [words[:, t] for t in range(16)]
+    for t in range(16, 64):
+        s0 = _rotr(w[t - 15], 7) ^ _rotr(w[t - 15], 18) ^ (w[t - 15] >> np.uint32(3))
+        s1 = _rotr(w[t - 2], 17) ^ _rotr(w[t - 2], 19) ^ (w[t - 2] >> np.uint32(10))
+        w.append(w[t - 16] + s0 + w[t - 7] + s1)
+
+    a, b, c, d, e, f, g, h = state
+    for t in range(64):
+        s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+        ch = (e & f) ^ (~e & g)
+        temp1 = h + s1 + ch + K[t] + w[t]
+        s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+        maj = (a & b) ^ (a & c) ^ (b & c)
+        temp2 = s0 + maj
+        h, g, f, e, d, c, b, a = g, f, e, d + temp1, c, b, a, temp1 + temp2
+
+    return [x + y for x, y in zip(state, (a, b, c, d, e, f, g, h))]
+
+
+def _to_words(blocks):
+    # (n, 64 * k) uint8 big-endian bytes -> (n, 16 * k) uint32
+    return blocks.view('>u4').astype(np.uint32)
+
+
+def _prefix_midstate(prefix_bytes):
+    # Compress every complete 64-byte block of the prefix once; only the
+    # remainder has to be combined with each nonce.
+    full = len(prefix_bytes) - len(prefix_bytes) % 64
+    state = [np.array([word], dtype=np.uint32) for word in H0]
+    if full:
+        blocks = _to_words(np.frombuffer(prefix_bytes[:full], dtype=np.uint8).reshape(1, -1))
+        for offset in range(0, blocks.shape[1], 16):
+            state = _compress(state, blocks[:, offset:offset + 16])
+    return state, prefix_bytes[full:]
+
+
+def _hash_batch(midstate, remainder, prefix_length, start, count):
+    # Digest words (8 arrays) for the nonces start..start+count-1. Nonces are
+    # fixed-width, so every candidate shares one padding layout.
+    nonces = np.arange(start, start + count, dtype=np.uint64)
+    tail_length = len(remainder) + NONCE_SIZE
+    padded_length = (tail_length + 9 + 63) // 64 * 64
+
+    tail = np.zeros((count, padded_length), dtype=np.uint8)
+    tail[:, :len(remainder)] = np.frombuffer(remainder, dtype=np.uint8)
+    for position in range(NONCE_SIZE):
+        shift = np.uint64(8 * (NONCE_SIZE - 1 - position))
+        tail[:, len(remainder) + position] = (nonces >> shift).astype(np.uint8)
+    tail[:, tail_length] = 0x80
+    tail[:, -8:] = np.frombuffer(((prefix_length + NONCE_SIZE) * 8).to_bytes(8, 'big'), dtype=np.uint8)
+
+    words = _to_words(tail)
+    state = [np.repeat(word, count) for word in midstate]
+    for offset in range(0, words.shape[1], 16):
+        state = _compress(state, words[:, offset:offset + 16])
+    return state
+
+
+def _target_words(target):
+    return [np.uint32((target >> (32 * (7 - i))) & 0xffffffff) for i in range(8)]
+
+
+def _meets_target(digest, target_words):
+    # Lexicographic digest <= target over the 8 big-endian words
+    result = np.ones(len(digest[0]), dtype=bool)
+    for word, limit in zip(reversed(digest), reversed(target_words)):
+        result = (word < limit) | ((word == limit) & result)
+    return result
+
+
+def _hex(digest, i):
+    return ''.join(f"{int(word[i]):08x}" for word in digest)
+
+
+def sha256_batch(prefix, nonces):
+    """Hex digests of prefix + 8-byte big-endian nonce for consecutive `nonces` (a range)."""
+    midstate, remainder = _prefix_midstate(prefix)
+    digest = _hash_batch(midstate, remainder, len(prefix), nonces.start, len(nonces))
+    return [_hex(digest, i) for i in range(len(nonces))]
+
+
+def prefix_state(prefix):
+    """Midstate of `prefix`, compressed once per block and reused for every batch."""
+    midstate, remainder = _prefix_midstate(prefix)
+    return midstate, remainder, len(prefix)
+
+
+def search_nonces(state, target, start, count=BATCH_SIZE):
+    """Vectorized counterpart of pow_mining.search_nonces over one batch.
+
+    `state` comes from prefix_state(). Returns (nonce, hash, hashes_tried);
+    nonce is None when nothing matched.
+    """
+    midstate, remainder, prefix_length = state
+    digest = _hash_batch(midstate, remainder, prefix_length, start, count)
+    hits = np.flatnonzero(_meets_target(digest, _target_words(target)))
+    if len(hits):
+        return start + int(hits[0]), _hex(digest, hits[0]), int(hits[0]) + 1
+    return None, None, count
+
+
+def mine(prefix, target, start_nonce=0):
+    """Batched single-process nonce search. Returns (nonce, hash, hashes_tried)."""
+    state = prefix_state(prefix)
+    nonce = start_nonce
+    hashes = 0
+    while True:
+        found, block_hash, tried = search_nonces(state, target, nonce)
+        hashes += tried
+        if found is not None:
+            return found, block_hash, hashes
+        nonce += tried
+
+
+if __name__ == "__main__":
+    from pow_mining import mine as hashlib_mine, difficulty_to_target
+
+    header = pack_header(1, time.time(), "0" * 64, payload_digest(["User1: 'Decentralized networks empower freedom!'"] * 50), "")
+    prefix = header[:-NONCE_SIZE]
+    target = difficulty_to_target(5)
+    for name, miner in (("hashlib", hashlib_mine), ("numpy", mine)):
+        started = time.perf_counter()
+        nonce, block_hash, hashes = miner(prefix, target)
+        elapsed = time.perf_counter() - started
+        print(f"{name:8} nonce {nonce} hash {block_hash} ({hashes / elapsed:,.0f} H/s)")
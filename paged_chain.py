@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict, deque
+
+RESIDENT_BLOCKS = 64  # Newest blocks always kept in memory
+CACHE_BLOCKS = 256  # Older blocks kept after being read, least recently used dropped first
+
+
+class PagedChain:
+    # List-like replacement for Blockchain.chain backed by a block store
+    # (BlockLog or SQLiteBlockStore): only the newest `resident` blocks stay in
+    # memory, older ones are read from the store by height on demand and kept
+    # in an LRU cache of `cache_size` blocks. Appended blocks stay resident
+    # until they have been saved, so nothing unsaved is ever dropped.
+    # Changes made to a block read from the store are lost once it is evicted.
+    # Safe to share between threads (e.g. Streamlit sessions reading one chain).
+    def __init__(self, block_class, store, resident=RESIDENT_BLOCKS, cache_size=CACHE_BLOCKS):
+        self.block_class = block_class
+        self.store = store
+        self.resident = resident
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # height -> block
+        self._lock = threading.RLock()  # Guards the tail, the LRU order and faults
+        self.faults = 0  # Blocks read back from the store
+        stored = len(store)
+        self._tail_start = max(0, stored - resident)
+        self._tail = deque(block_class.from_row(store.get(height)) for height in range(self._tail_start, stored))
+
+    def __len__(self):
+        with self._lock:
+            return self._tail_start + len(self._tail)
+
+    def append(self, block):
+        with self._lock:
+            self._tail.append(block)
+            # Page out the oldest resident block once the store holds that same block
+            while len(self._tail) > self.resident and self._is_saved(self._tail_start, self._tail[0]):
+                self._remember(self._tail_start, self._tail.popleft())
+                self._tail_start += 1
+
+    def _is_saved(self, height, block):
+        return height < len(self.store) and self.store.get(height)["hash"] == block.hash
+
+    def extend(self, blocks):
+        for block in blocks:
+            self.append(block)
+
+    def _remember(self, height, block):
+        self._cache[height] = block
+        self._cache.move_to_end(height)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _block(self, height):
+        # Caller holds the lock
+        if height >= self._tail_start:
+            return self._tail[height - self._tail_start]
+        if height in self._cache:
+            self._cache.move_to_end(height)
+            return self._cache[height]
+        self.faults += 1
+        block = self.block_class.from_row(self.store.get(height))
+        self._remember(height, block)
+        return block
+
+    def __getitem__(self, position):
+        with self._lock:
+            if isinstance(position, slice):
+                return [self._block(height) for height in range(*position.indices(len(self)))]
+            if position < 0:
+                position += len(self)
+            if not 0 <= position < len(self):
+                raise IndexError("chain index out of range")
+            return self._block(position)
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self[height]
+
+    def resident_blocks(self):
+        with self._lock:
+            return len(self._tail) + len(self._cache)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+    import tracemalloc
+
+    from block_log import BlockLog
+    from simple_blockchain6 import Block
+
+    count = 20_000
+    log = BlockLog(os.path.join(tempfile.mkdtemp(), "blockchain"))
+    previous_hash = "0"
+    rows = []
+    for i in range(count):
+        block = Block(i, previous_hash, time.time(), [f"User{i % 50}: post {i}"], f"V{i % 5}")
+        rows.append({"index": i, "previous_hash": previous_hash, "timestamp": block.timestamp, "transactions": block.transactions,
+                     "validator": block.validator, "hash": block.hash, "header_version": block.header_version})
+        previous_hash = block.hash
+    log.insert_multiple(rows)
+
+    tracemalloc.start()
+    full = [Block.from_row(row) for row in log.all()]
+    full_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    paged = PagedChain(Block, log)
+    paged_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{count} blocks: full list {full_memory / 1e6:.1f} MB, paged chain {paged_memory / 1e6:.2f} MB ({paged.resident_blocks()} resident)")
+
+    started = time.perf_counter()
+    assert all(paged[height].hash == full[height].hash for height in range(0, count, 97))
+    print(f"random historical reads: {(time.perf_counter() - started) * 1e6 / len(range(0, count, 97)):.0f} us/block, {paged.faults} faults")
+    log.close()
@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from block_header import hash_from_fields
+from pow_mining import bits_to_target
+
+SHARDS_PER_WORKER = 4  # More shards than workers evens out uneven block sizes
+
+
+def _record(block):
+    return (block.hash, block.previous_hash, block.hash_fields(), getattr(block, "bits", None))
+
+
+def _check_shard(first_height, records):
+    # First bad height inside one shard: recomputed hash, links between the
+    # shard's own blocks and, for PoW blocks, the proof of work
+    for offset, (block_hash, previous_hash, fields, bits) in enumerate(records):
+        if block_hash != hash_from_fields(fields):
+            return first_height + offset
+        if offset and previous_hash != records[offset - 1][0]:
+            return first_height + offset
+        if bits is not None and int(block_hash, 16) > bits_to_target(bits):
+            return first_height + offset
+    return None
+
+
+def find_invalid_height(chain, workers=None):
+    """Cold audit of `chain` across a process pool.
+
+    Returns the first height whose hash, link or proof of work is broken,
+    or None when every block checks out. Genesis is taken as given.
+    """
+    workers = workers or os.cpu_count() or 1
+    if len(chain) < 2:
+        return None
+    shard_size = -(-(len(chain) - 1) // (workers * SHARDS_PER_WORKER))
+    starts = range(1, len(chain), shard_size)
+
+    # Workers only see their own shard, so links into each shard's first block are checked here
+    failures = [start for start in starts if chain[start].previous_hash != chain[start - 1].hash]
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_check_shard, start, [_record(block) for block in chain[start:start + shard_size]]) for start in starts]
+        failures += [future.result() for future in futures if future.result() is not None]
+    return min(failures) if failures else None
+
+
+class ChainValidation:
+    # Mixin for the Blockchain classes: validates self.chain incrementally,
+    # remembering the highest block already checked and its hash
+    verified_height = 0
+    verified_hash = None  # A replaced chain no longer has this hash at verified_height
+
+    def block_rule_error(self, height):
+        # Consensus rules beyond hash and link for the block at `height`;
+        # returns the failure message or None. PoW chains check their target here.
+        return None
+
+    def is_chain_valid(self, full=False, workers=1):
+        # Only the blocks above the last verified one are checked, unless a full
+        # re-audit is asked for or that block is no longer on the chain
+        start = 1
+        if not full and self.verified_height < len(self.chain) and self.chain[self.verified_height].hash == self.verified_hash:
+            start = self.verified_height + 1
+
+        if full and workers > 1:
+            # Cold audit sharded across worker processes; the rules that need
+            # earlier blocks (e.g. retargeting) are then checked here in order
+            invalid_height = find_invalid_height(self.chain, workers)
+            if invalid_height is not None:
+                print(f"Block {invalid_height} is invalid!")
+                return False
+            for i in range(1, len(self.chain)):
+                error = self.block_rule_error(i)
+                if error:
+                    print(error)
+                    return False
+            start = len(self.chain)
+
+        for i in range(start, len(self.chain)):
+            current_block = self.chain[i]
+            previous_block = self.chain[i - 1]
+
+            if not current_block.has_valid_hash():  # Recomputed from the fields, never the cached hash
+                print("Current block hash is invalid!")
+                return False
+
+            if current_block.previous_hash != previous_block.hash:
+                print("Previous block hash is invalid!")
+                return False
+
+            error = self.block_rule_error(i)
+            if error:
+                print(error)
+                return False
+
+        self.verified_height = len(self.chain) - 1
+        self.verified_hash = self.chain[-1].hash
+        return True
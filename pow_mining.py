@@ -0,0 +1,207 @@
+import hashlib
+import multiprocessing as mp
+import queue
+import time
+from fractions import Fraction
+
+from block_header import NONCE_SIZE, pack_header, payload_digest
+
+CHUNK_SIZE = 10_000  # Nonces tried between checks of the shared stop flag
+POLL_INTERVAL = 0.5  # Seconds between checks that every mining worker is still alive
+MAX_TARGET = (1 << 256) - 1
+MAX_ADJUSTMENT = 4  # A retarget moves the target by at most this factor
+
+
+def difficulty_to_target(difficulty):
+    # Accepts exactly the hashes starting with `difficulty` hex zeros
+    return (1 << (256 - 4 * difficulty)) - 1
+
+
+def bits_to_target(bits):
+    # Compact "bits" encoding: 1-byte base-256 exponent, 3-byte mantissa
+    exponent = bits >> 24
+    mantissa = bits & 0x007fffff
+    if exponent <= 3:
+        return mantissa >> (8 * (3 - exponent))
+    return mantissa << (8 * (exponent - 3))
+
+
+def target_to_bits(target):
+    size = (target.bit_length() + 7) // 8
+    if size <= 3:
+        mantissa = target << (8 * (3 - size))
+    else:
+        mantissa = target >> (8 * (size - 3))
+    if mantissa & 0x00800000:  # Keep the mantissa's sign bit clear
+        mantissa >>= 8
+        size += 1
+    return (size << 24) | mantissa
+
+
+def retarget_bits(bits, actual_timespan, expected_timespan):
+    # Scale the target by how long the last window actually took, so blocks
+    # that came too fast make the next window harder and vice versa. The ratio
+    # is exact (Fraction of the two floats), so the clamp holds at any timescale.
+    if expected_timespan <= 0:
+        raise ValueError("expected_timespan must be positive")
+    ratio = Fraction(actual_timespan) / Fraction(expected_timespan)
+    ratio = min(max(ratio, Fraction(1, MAX_ADJUSTMENT)), Fraction(MAX_ADJUSTMENT))
+    target = bits_to_target(bits) * ratio.numerator // ratio.denominator
+    return target_to_bits(min(max(target, 1), MAX_TARGET))
+
+
+def prefix_state(prefix):
+    # Absorb the constant part of the block header once; every nonce attempt
+    # then only copies this state and feeds in the 8 nonce bytes.
+    return hashlib.sha256(prefix)
+
+
+def search_nonces(state, target, start, step=1, count=CHUNK_SIZE):
+    """Try `count` nonces from `start` on a prefix state.
+
+    Returns (nonce, hash, hashes_tried); nonce is None when nothing matched.
+    """
+    tried = 0
+    for nonce in range(start, start + step * count, step):
+        attempt = state.copy()
+        attempt.update(nonce.to_bytes(NONCE_SIZE, 'big'))
+        tried += 1
+        if int.from_bytes(attempt.digest(), 'big') <= target:
+            return nonce, attempt.hexdigest(), tried
+    return None, None, tried
+
+
+def mine(prefix, target, start_nonce=0):
+    """Single-process nonce search. Returns (nonce, hash, hashes_tried)."""
+    state = prefix_state(prefix)
+    nonce = start_nonce
+    hashes = 0
+    while True:
+        found, block_hash, tried = search_nonces(state, target, nonce)
+        hashes += tried
+        if found is not None:
+            return found, block_hash, hashes
+        nonce += tried
+
+
+def get_miner(backend="hashlib"):
+    # Single-process search function for a mining backend
+    if backend == "numpy":
+        from numpy_mining import mine as numpy_mine  # NumPy is only required for this backend
+        return numpy_mine
+    if backend != "hashlib":
+        raise ValueError(f"Unknown mining backend: {backend}")
+    return mine
+
+
+def _search_worker(prefix, target, start_nonce, worker, workers, backend, stop_event, results):
+    # Worker number `worker` of `workers`: with hashlib it tries every
+    # workers-th nonce, with numpy every workers-th batch, so the workers
+    # together cover every nonce exactly once.
+    if backend == "numpy":
+        import numpy_mining
+        state = numpy_mining.prefix_state(prefix)
+        nonce = start_nonce + worker * numpy_mining.BATCH_SIZE
+        search = lambda nonce: numpy_mining.search_nonces(state, target, nonce)
+    else:
+        state = prefix_state(prefix)
+        nonce = start_nonce + worker
+        search = lambda nonce: search_nonces(state, target, nonce, workers)
+    hashes = 0
+    while not stop_event.is_set():
+        found, block_hash, tried = search(nonce)
+        hashes += tried
+        if found is not None:
+            stop_event.set()
+            results.put((found, block_hash, hashes))
+            return
+        nonce += workers * tried
+    results.put((None, None, hashes))
+
+
+def parallel_mine(prefix, target, workers, start_nonce=0, timeout=None, backend="hashlib"):
+    """Search nonces for `prefix` across `workers` processes using `backend`.
+
+    Returns (nonce, hash, hashes_tried, elapsed_seconds). Raises RuntimeError
+    if a worker dies before a nonce is found and TimeoutError after `timeout`
+    seconds without one; the workers are terminated in both cases.
+    """
+    get_miner(backend)  # Unknown backends (or a missing NumPy) fail here, not in every worker
+    stop_event = mp.Event()
+    results = mp.Queue()
+    processes = [
+        mp.Process(target=_search_worker, args=(prefix, target, start_nonce, i, workers, backend, stop_event, results), daemon=True)
+        for i in range(workers)
+    ]
+
+    started = time.time()
+    for process in processes:
+        process.start()
+
+    winner = None
+    hashes = 0
+    reported = 0
+    try:
+        while reported < len(processes):  # Every live worker reports exactly once
+            try:
+                nonce, block_hash, tried = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                # A worker that died (crash, OOM kill) never reports, so don't wait for it
+                crashed = [process for process in processes if process.exitcode not in (None, 0)]
+                if crashed and winner is None:
+                    raise RuntimeError(f"Mining worker exited with code {crashed[0].exitcode}")
+                if crashed:
+                    break
+                if timeout is not None and time.time() - started > timeout:
+                    raise TimeoutError(f"No valid nonce found within {timeout} s")
+                continue
+            reported += 1
+            hashes += tried
+            if nonce is not None and winner is None:
+                winner = (nonce, block_hash)
+    except BaseException:
+        stop_event.set()
+        for process in processes:
+            process.terminate()
+        raise
+    finally:
+        for process in processes:
+            process.join()
+    elapsed = time.time() - started
+
+    return winner[0], winner[1], hashes, elapsed
+
+
+def benchmark(transaction_count=2000, attempts=20_000):
+    # Compare rebuilding the whole block per nonce (the old f-string and a full
+    # header re-pack) against the prefix midstate, on a block carrying
+    # `transaction_count` social media posts.
+    transactions = [f"User{i}: 'Decentralized networks empower freedom!'" for i in range(transaction_count)]
+    index, previous_hash, timestamp = 1, "0" * 64, time.time()
+
+    started = time.perf_counter()
+    for nonce in range(attempts):
+        block_string = f"{index}{previous_hash}{timestamp}{transactions}{nonce}"
+        hashlib.sha256(block_string.encode()).hexdigest()
+    naive = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for nonce in range(attempts):
+        hashlib.sha256(pack_header(index, timestamp, previous_hash, payload_digest(transactions), "", nonce)).hexdigest()
+    repack = time.perf_counter() - started
+
+    started = time.perf_counter()
+    header = pack_header(index, timestamp, previous_hash, payload_digest(transactions), "")
+    state = prefix_state(header[:-NONCE_SIZE])
+    search_nonces(state, -1, 0, count=attempts)  # A negative target never matches
+    midstate = time.perf_counter() - started
+
+    print(f"{transaction_count} transactions, {attempts} nonces")
+    print(f"  string rebuild: {attempts / naive:,.0f} H/s")
+    print(f"  header re-pack: {attempts / repack:,.0f} H/s")
+    print(f"  midstate:       {attempts / midstate:,.0f} H/s ({naive / midstate:.1f}x faster than string rebuild)")
+
+
+if __name__ == "__main__":
+    for transaction_count in (0, 100, 2000):
+        benchmark(transaction_count)
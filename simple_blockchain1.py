@@ -1,56 +1,85 @@
-import hashlib
 import time
+from pow_mining import bits_to_target, difficulty_to_target, get_miner, parallel_mine, retarget_bits, target_to_bits
+from block_header import NONCE_SIZE, BaseBlock
+from parallel_validation import ChainValidation
 
-class Block:
-    def __init__(self, index, previous_hash, timestamp, data, nonce=0):
+class Block(BaseBlock):
+    payload_field = "data"
+    producer_field = None  # Proof of work: the nonce is the only producer-specific field
+
+    def __init__(self, index, previous_hash, timestamp, data, nonce=0, bits=None):
         self.index = index
         self.previous_hash = previous_hash
         self.timestamp = timestamp
         self.data = data
         self.nonce = nonce
+        self.bits = bits  # Compact PoW target this block was mined against
         self.hash = self.calculate_hash()
 
-    def calculate_hash(self):
-        block_string = f"{self.index}{self.previous_hash}{self.timestamp}{self.data}{self.nonce}"
-        return hashlib.sha256(block_string.encode()).hexdigest()
-
-    def mine_block(self, difficulty):
-        target = '0' * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
-        print(f"Block mined: {self.hash}")
-
-class Blockchain:
-    def __init__(self, difficulty=4):
-        self.chain = [self.create_genesis_block()]
+    def hash_prefix(self):
+        # The binary header minus its trailing nonce
+        return self.header_bytes()[:-NONCE_SIZE]
+
+    def mine_block(self, workers=1, backend="hashlib"):
+        started = time.time()
+        prefix = self.hash_prefix()  # Packed once, not per nonce
+        target = bits_to_target(self.bits)
+        if workers > 1:
+            # Split the nonce space across a process pool; first valid hash wins
+            self.nonce, self.hash, hashes, _ = parallel_mine(prefix, target, workers, self.nonce, backend=backend)
+        else:
+            # "hashlib" tries one nonce at a time, "numpy" hashes large batches at once
+            self.nonce, self.hash, hashes = get_miner(backend)(prefix, target, self.nonce)
+        hash_rate = hashes / max(time.time() - started, 1e-9)
+        print(f"Block mined: {self.hash} ({hashes} hashes, {hash_rate:,.0f} H/s on {workers} worker(s))")
+        return hash_rate
+
+class Blockchain(ChainValidation):
+    def __init__(self, difficulty=4, workers=1, bits=None, block_interval=None, retarget_interval=10, backend="hashlib"):
+        if block_interval is not None and block_interval <= 0:
+            raise ValueError("block_interval must be positive (or None to disable retargeting)")
+        if retarget_interval < 2:
+            raise ValueError("retarget_interval must be at least 2 blocks")
         self.difficulty = difficulty
+        # Compact target of the genesis block; `difficulty` leading hex zeros unless bits are given
+        self.initial_bits = bits if bits is not None else target_to_bits(difficulty_to_target(difficulty))
+        self.block_interval = block_interval  # Desired seconds per block, None disables retargeting
+        self.retarget_interval = retarget_interval  # Blocks between target adjustments
+        self.chain = [self.create_genesis_block()]
+        self.workers = workers  # Processes used for the nonce search
+        self.backend = backend  # Single-process hashing engine, see pow_mining.get_miner
+        self.hash_rate = 0  # Aggregate hashes/sec of the last mined block
 
     def create_genesis_block(self):
-        return Block(0, "0", time.time(), "Genesis Block")
+        return Block(0, "0", time.time(), "Genesis Block", bits=self.initial_bits)
 
     def get_latest_block(self):
         return self.chain[-1]
 
+    def next_bits(self, height):
+        # Target for the block at `height`: the previous block's, rescaled every
+        # `retarget_interval` blocks by how long the last window actually took
+        previous_bits = self.chain[height - 1].bits
+        if not self.block_interval or height % self.retarget_interval != 0:
+            return previous_bits
+        first_block = self.chain[height - self.retarget_interval]
+        last_block = self.chain[height - 1]
+        expected_timespan = self.block_interval * (self.retarget_interval - 1)
+        return retarget_bits(previous_bits, last_block.timestamp - first_block.timestamp, expected_timespan)
+
     def add_block(self, new_block):
         new_block.previous_hash = self.get_latest_block().hash
-        new_block.mine_block(self.difficulty)
+        new_block.bits = self.next_bits(len(self.chain))
+        self.hash_rate = new_block.mine_block(self.workers, self.backend)
         self.chain.append(new_block)
 
-    def is_chain_valid(self):
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-
-            if current_block.hash != current_block.calculate_hash():
-                print("Current block hash is invalid!")
-                return False
-
-            if current_block.previous_hash != previous_block.hash:
-                print("Previous block hash is invalid!")
-                return False
-
-        return True
+    def block_rule_error(self, height):
+        block = self.chain[height]
+        if block.bits != self.next_bits(height):
+            return "Block target is invalid!"
+        if int(block.hash, 16) > bits_to_target(block.bits):
+            return "Proof of work is invalid!"
+        return None
 
 # Example usage
 if __name__ == "__main__":
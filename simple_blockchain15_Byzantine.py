@@ -1,8 +1,10 @@
-import hashlib
 import time
 import random
+from block_header import BaseBlock
+from parallel_validation import ChainValidation
+from merkle import InclusionProofs
 
-class Block:
+class Block(BaseBlock):
     def __init__(self, index, previous_hash, timestamp, transactions, validator):
         self.index = index
         self.previous_hash = previous_hash
@@ -11,11 +13,7 @@ class Block:
         self.validator = validator
         self.hash = self.calculate_hash()
 
-    def calculate_hash(self):
-        block_string = f"{self.index}{self.previous_hash}{self.timestamp}{self.transactions}{self.validator}"
-        return hashlib.sha256(block_string.encode()).hexdigest()
-
-class Blockchain:
+class Blockchain(ChainValidation, InclusionProofs):
     def __init__(self):
         self.chain = [self.create_genesis_block()]
         self.pending_transactions = []
@@ -34,21 +32,6 @@ class Blockchain:
         self.chain.append(new_block)
         self.pending_transactions = []
 
-    def is_chain_valid(self):
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-
-            if current_block.hash != current_block.calculate_hash():
-                print("Current block hash is invalid!")
-                return False
-
-            if current_block.previous_hash != previous_block.hash:
-                print("Previous block hash is invalid!")
-                return False
-
-        return True
-
     def create_transaction(self, transaction):
         self.pending_transactions.append(transaction)
 
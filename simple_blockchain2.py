@@ -1,65 +1,197 @@
-import hashlib
+import threading
 import time
+from pow_mining import bits_to_target, difficulty_to_target, get_miner, parallel_mine, prefix_state, retarget_bits, search_nonces, target_to_bits
+from block_header import NONCE_SIZE, BaseBlock
+from parallel_validation import ChainValidation
+from merkle import InclusionProofs
 
-class Block:
-    def __init__(self, index, previous_hash, timestamp, transactions, nonce=0):
+class Block(BaseBlock):
+    producer_field = None  # Proof of work: the nonce is the only producer-specific field
+
+    def __init__(self, index, previous_hash, timestamp, transactions, nonce=0, bits=None):
         self.index = index
         self.previous_hash = previous_hash
         self.timestamp = timestamp
         self.transactions = transactions
         self.nonce = nonce
+        self.bits = bits  # Compact PoW target this block was mined against
         self.hash = self.calculate_hash()
 
-    def calculate_hash(self):
-        block_string = f"{self.index}{self.previous_hash}{self.timestamp}{self.transactions}{self.nonce}"
-        return hashlib.sha256(block_string.encode()).hexdigest()
-
-    def mine_block(self, difficulty):
-        target = '0' * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
-        print(f"Block mined: {self.hash}")
-
-class Blockchain:
-    def __init__(self, difficulty=4):
-        self.chain = [self.create_genesis_block()]
+    def hash_prefix(self):
+        # The binary header minus its trailing nonce
+        return self.header_bytes()[:-NONCE_SIZE]
+
+    def mine_block(self, workers=1, backend="hashlib"):
+        started = time.time()
+        prefix = self.hash_prefix()  # Packed once, not per nonce
+        target = bits_to_target(self.bits)
+        if workers > 1:
+            # Split the nonce space across a process pool; first valid hash wins
+            self.nonce, self.hash, hashes, _ = parallel_mine(prefix, target, workers, self.nonce, backend=backend)
+        else:
+            # "hashlib" tries one nonce at a time, "numpy" hashes large batches at once
+            self.nonce, self.hash, hashes = get_miner(backend)(prefix, target, self.nonce)
+        hash_rate = hashes / max(time.time() - started, 1e-9)
+        print(f"Block mined: {self.hash} ({hashes} hashes, {hash_rate:,.0f} H/s on {workers} worker(s))")
+        return hash_rate
+
+class Blockchain(ChainValidation, InclusionProofs):
+    def __init__(self, difficulty=4, workers=1, bits=None, block_interval=None, retarget_interval=10, backend="hashlib"):
+        if block_interval is not None and block_interval <= 0:
+            raise ValueError("block_interval must be positive (or None to disable retargeting)")
+        if retarget_interval < 2:
+            raise ValueError("retarget_interval must be at least 2 blocks")
         self.difficulty = difficulty
+        # Compact target of the genesis block; `difficulty` leading hex zeros unless bits are given
+        self.initial_bits = bits if bits is not None else target_to_bits(difficulty_to_target(difficulty))
+        self.block_interval = block_interval  # Desired seconds per block, None disables retargeting
+        self.retarget_interval = retarget_interval  # Blocks between target adjustments
+        self.chain = [self.create_genesis_block()]
+        self.workers = workers  # Processes used for the nonce search
+        self.backend = backend  # Single-process hashing engine, see pow_mining.get_miner
+        self.hash_rate = 0  # Aggregate hashes/sec of the last mined block
         self.pending_transactions = []
+        self.lock = threading.Lock()  # Guards the chain tip and pending transactions across threads
 
     def create_genesis_block(self):
-        return Block(0, "0", time.time(), "Genesis Block")
+        return Block(0, "0", time.time(), "Genesis Block", bits=self.initial_bits)
 
     def get_latest_block(self):
         return self.chain[-1]
 
-    def add_block(self, new_block):
-        new_block.previous_hash = self.get_latest_block().hash
-        new_block.mine_block(self.difficulty)
-        self.chain.append(new_block)
-
-    def is_chain_valid(self):
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-
-            if current_block.hash != current_block.calculate_hash():
-                print("Current block hash is invalid!")
-                return False
+    def next_bits(self, height):
+        # Target for the block at `height`: the previous block's, rescaled every
+        # `retarget_interval` blocks by how long the last window actually took
+        previous_bits = self.chain[height - 1].bits
+        if not self.block_interval or height % self.retarget_interval != 0:
+            return previous_bits
+        first_block = self.chain[height - self.retarget_interval]
+        last_block = self.chain[height - 1]
+        expected_timespan = self.block_interval * (self.retarget_interval - 1)
+        return retarget_bits(previous_bits, last_block.timestamp - first_block.timestamp, expected_timespan)
 
-            if current_block.previous_hash != previous_block.hash:
-                print("Previous block hash is invalid!")
+    def add_block(self, new_block):
+        # Mine outside the lock, then append only if no other block (e.g. from a
+        # BackgroundMiner) took the tip meanwhile; otherwise mine again on the new tip
+        while True:
+            with self.lock:
+                tip = self.get_latest_block()
+                new_block.index = len(self.chain)
+                new_block.previous_hash = tip.hash
+                new_block.bits = self.next_bits(len(self.chain))
+            self.hash_rate = new_block.mine_block(self.workers, self.backend)
+            with self.lock:
+                if self.get_latest_block() is tip:
+                    self.chain.append(new_block)
+                    return
+
+    def block_rule_error(self, height):
+        block = self.chain[height]
+        if block.bits != self.next_bits(height):
+            return "Block target is invalid!"
+        if int(block.hash, 16) > bits_to_target(block.bits):
+            return "Proof of work is invalid!"
+        return None
+
+    def receive_block(self, block):
+        # Append a block mined elsewhere (or by a BackgroundMiner) if it extends our tip
+        with self.lock:
+            height = len(self.chain)
+            if (block.previous_hash != self.get_latest_block().hash
+                    or block.bits != self.next_bits(height)
+                    or not block.has_valid_hash()
+                    or int(block.hash, 16) > bits_to_target(block.bits)):
+                print(f"Block {block.index} rejected: does not extend the current tip")
                 return False
-
+            self.chain.append(block)
+            included = block.transactions
+            self.pending_transactions = [tx for tx in self.pending_transactions if tx not in included]
         return True
 
     def create_transaction(self, transaction):
-        self.pending_transactions.append(transaction)
+        with self.lock:
+            self.pending_transactions.append(transaction)
 
     def mine_pending_transactions(self):
-        new_block = Block(len(self.chain), "", time.time(), self.pending_transactions)
+        with self.lock:
+            transactions = list(self.pending_transactions)
+        new_block = Block(len(self.chain), "", time.time(), transactions)
         self.add_block(new_block)
-        self.pending_transactions = []
+        with self.lock:
+            # Transactions created while mining stay pending for the next block
+            self.pending_transactions = [tx for tx in self.pending_transactions if tx not in transactions]
+
+class BackgroundMiner:
+    # Mines on a worker thread and abandons the attempt as soon as the chain tip
+    # moves or new transactions arrive, restarting with a fresh copy of the
+    # pending transactions.
+    def __init__(self, blockchain):
+        self.blockchain = blockchain
+        self._stop = threading.Event()
+        self._thread = None
+        self.blocks_mined = 0
+        self.restarts = 0  # Attempts abandoned because another block arrived first
+        self.refreshes = 0  # Attempts restarted to include newly created transactions
+        self.total_hashes = 0
+        self.wasted_hashes = 0  # Hashes spent on attempts that were abandoned
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def stats(self):
+        return {
+            "blocks_mined": self.blocks_mined,
+            "restarts": self.restarts,
+            "refreshes": self.refreshes,
+            "total_hashes": self.total_hashes,
+            "wasted_hashes": self.wasted_hashes,
+            "wasted_ratio": self.wasted_hashes / self.total_hashes if self.total_hashes else 0,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.blockchain.pending_transactions:
+                self._stop.wait(0.1)  # Nothing to mine yet
+                continue
+            self._mine_on_tip()
+
+    def _mine_on_tip(self):
+        chain = self.blockchain
+        with chain.lock:
+            tip = chain.get_latest_block()
+            transactions = list(chain.pending_transactions)
+            bits = chain.next_bits(tip.index + 1)
+        block = Block(tip.index + 1, tip.hash, time.time(), transactions, bits=bits)
+        state = prefix_state(block.hash_prefix())
+        target = bits_to_target(block.bits)
+        nonce = 0
+        hashes = 0
+        # Check for cancellation between chunks of pow_mining.CHUNK_SIZE nonces
+        while not self._stop.is_set() and chain.get_latest_block() is tip and chain.pending_transactions == transactions:
+            found, block_hash, tried = search_nonces(state, target, nonce)
+            hashes += tried
+            self.total_hashes += tried
+            if found is not None:
+                block.nonce, block.hash = found, block_hash
+                if chain.receive_block(block):
+                    self.blocks_mined += 1
+                    print(f"Block mined in background: {block.hash}")
+                    return
+                break  # Lost the race for this height
+            nonce += tried
+        if not self._stop.is_set():
+            if chain.get_latest_block() is tip:
+                self.refreshes += 1
+            else:
+                self.restarts += 1
+        self.wasted_hashes += hashes
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from block_log import rows_from_tinydb
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    height INTEGER PRIMARY KEY,  -- Position in the store, 0 = first block saved
+    "index" INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    previous_hash TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    validator TEXT,
+    header_version INTEGER,
+    single_payload INTEGER NOT NULL DEFAULT 0  -- Payload is one value (genesis), not a list
+);
+CREATE INDEX IF NOT EXISTS blocks_index ON blocks("index");
+CREATE INDEX IF NOT EXISTS blocks_hash ON blocks(hash);
+CREATE INDEX IF NOT EXISTS blocks_previous_hash ON blocks(previous_hash);
+CREATE INDEX IF NOT EXISTS blocks_validator ON blocks(validator);
+CREATE INDEX IF NOT EXISTS blocks_timestamp ON blocks(timestamp);
+CREATE TABLE IF NOT EXISTS transactions (
+    block_height INTEGER NOT NULL REFERENCES blocks(height) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    body TEXT NOT NULL,  -- JSON
+    PRIMARY KEY (block_height, position)
+);
+"""
+BLOCK_COLUMNS = 'height, "index", hash, previous_hash, timestamp, validator, header_version, single_payload'
+
+
+class SQLiteBlockStore:
+    # Block store on stdlib sqlite3 (WAL mode) with indexed lookups by height,
+    # hash, previous hash, validator and timestamp. Offers the same calls as
+    # block_log.BlockLog, so the Streamlit apps can use either.
+    def __init__(self, path="blockchain.db", legacy_json=None):
+        self._lock = threading.Lock()  # One connection shared by every session thread
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+        if legacy_json and not len(self) and os.path.exists(legacy_json):
+            self.import_tinydb(legacy_json)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+
+    def insert_multiple(self, rows):
+        with self._lock, self._db:  # One transaction for the whole batch
+            return self._append(rows)
+
+    def _append(self, rows):
+        # Caller holds the lock and the transaction
+        height = self._db.execute("SELECT COALESCE(MAX(height) + 1, 0) FROM blocks").fetchone()[0]
+        first = height
+        for row in rows:
+            transactions = row["transactions"]
+            single = not isinstance(transactions, list)
+            self._db.execute(
+                f"INSERT INTO blocks ({BLOCK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (height, row["index"], row["hash"], row["previous_hash"], row["timestamp"],
+                 row.get("validator"), row.get("header_version"), single),
+            )
+            self._db.executemany(
+                "INSERT INTO transactions (block_height, position, body) VALUES (?, ?, ?)",
+                [(height, position, json.dumps(body)) for position, body in enumerate([transactions] if single else transactions)],
+            )
+            height += 1
+        return list(range(first + 1, height + 1))
+
+    def insert(self, row):
+        return self.insert_multiple([row])[0]
+
+    def _rows(self, where="", params=(), limit=None, offset=0):
+        # Matching blocks in height order; with a limit, only that page of them
+        page, page_params = ("LIMIT ? OFFSET ?", (limit, offset)) if limit is not None else ("", ())
+        with self._lock:
+            blocks = self._db.execute(f"SELECT {BLOCK_COLUMNS} FROM blocks {where} ORDER BY height {page}", params + page_params).fetchall()
+            if not blocks:
+                return []
+            transactions = {}
+            # Fetch the child rows of every matching block in one query
+            for block_height, body in self._db.execute(
+                f"SELECT block_height, body FROM transactions WHERE block_height IN (SELECT height FROM blocks {where} ORDER BY height {page}) "
+                "ORDER BY block_height, position",
+                params + page_params,
+            ):
+                transactions.setdefault(block_height, []).append(json.loads(body))
+        rows = []
+        for height, index, block_hash, previous_hash, timestamp, validator, header_version, single in blocks:
+            payload = transactions.get(height, [])
+            rows.append({
+                "index": index,
+                "previous_hash": previous_hash,
+                "timestamp": timestamp,
+                "transactions": payload[0] if single else payload,
+                "validator": validator,
+                "hash": block_hash,
+                "header_version": header_version,
+            })
+        return rows
+
+    def _count(self, where="", params=()):
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM blocks {where}", params).fetchone()[0]
+
+    def all(self):
+        return self._rows()
+
+    def get(self, height):
+        rows = self._rows("WHERE height = ?", (height,))
+        if not rows:
+            raise IndexError("block height out of range")
+        return rows[0]
+
+    def last(self):
+        rows = self._rows("WHERE height = (SELECT MAX(height) FROM blocks)")
+        return rows[0] if rows else None
+
+    def block_by_hash(self, block_hash):
+        rows = self._rows("WHERE hash = ?", (block_hash,))
+        return rows[0] if rows else None
+
+    def height_of(self, block_hash):
+        with self._lock:
+            return self._db.execute("SELECT MIN(height) FROM blocks WHERE hash = ?", (block_hash,)).fetchone()[0]
+
+    def blocks_by_validator(self, validator, limit=None, offset=0):
+        return self._rows("WHERE validator = ?", (validator,), limit, offset)
+
+    def count_by_validator(self, validator):
+        return self._count("WHERE validator = ?", (validator,))
+
+    def blocks_in_time_range(self, start, end, limit=None, offset=0):
+        # Blocks with start <= timestamp < end (Unix seconds)
+        return self._rows("WHERE timestamp >= ? AND timestamp < ?", (start, end), limit, offset)
+
+    def count_in_time_range(self, start, end):
+        return self._count("WHERE timestamp >= ? AND timestamp < ?", (start, end))
+
+    def truncate(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM transactions")
+            self._db.execute("DELETE FROM blocks")
+
+    def replace_all(self, rows):
+        # Compaction/reorg rewrite in one transaction: readers and a crash see
+        # either the old blocks or the new ones, never an empty or partial store
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM transactions")
+            self._db.execute("DELETE FROM blocks")
+            return self._append(rows)
+
+    def import_tinydb(self, json_path):
+        # Import a TinyDB ledger such as blockchain.json. Blocks whose index is
+        # already stored are skipped, so running it again only adds new blocks.
+        rows = rows_from_tinydb(json_path)
+        with self._lock, self._db:
+            stored = {index for (index,) in self._db.execute('SELECT "index" FROM blocks')}
+            new_rows = [row for row in rows if row["index"] not in stored]
+            self._append(new_rows)
+        return len(new_rows)
+
+    def close(self):
+        self._db.close()
+
+
+if __name__ == "__main__":
+    # python sqlite_block_store.py blockchain.json [blockchain.db]
+    store = SQLiteBlockStore(sys.argv[2] if len(sys.argv) > 2 else "blockchain.db")
+    print(f"Imported {store.import_tinydb(sys.argv[1])} new blocks from {sys.argv[1]}")
@@ -0,0 +1,77 @@
+import json
+import os
+import time
+
+# Blockchain attributes that hold state outside the blocks; each class has a subset
+# (PoS: stakes/slash_records, DPoS: stakes/votes/delegates)
+STATE_FIELDS = ("stakes", "slash_records", "votes", "delegates")
+KEEP_SNAPSHOTS = 5  # Older snapshots are dropped when a new one is saved
+
+
+def take_snapshot(blockchain):
+    # State plus the tip it belongs to, and how far the chain had been verified
+    tip = blockchain.get_latest_block()
+    verified_block = blockchain.chain[blockchain.verified_height]
+    verified = blockchain.verified_hash == verified_block.hash
+    return {
+        "height": tip.index,
+        "hash": tip.hash,
+        "verified_height": verified_block.index if verified else blockchain.chain[0].index,
+        "verified_hash": verified_block.hash if verified else None,
+        "taken_at": time.time(),
+        "state": {field: getattr(blockchain, field) for field in STATE_FIELDS if hasattr(blockchain, field)},
+    }
+
+
+def restore_snapshot(blockchain, snapshot):
+    # Adopt the snapshot's state if its tip is on the loaded chain, then replay
+    # (verify) only the blocks above its checkpoint. Returns the number of blocks
+    # replayed, or None when the snapshot does not belong to this chain; a failed
+    # replay leaves verified_height below the tip.
+    first_index = blockchain.chain[0].index
+    position = snapshot["height"] - first_index
+    if not 0 <= position < len(blockchain.chain) or blockchain.chain[position].hash != snapshot["hash"]:
+        return None
+    for field, value in snapshot["state"].items():
+        setattr(blockchain, field, value)
+
+    verified_position = snapshot["verified_height"] - first_index
+    if snapshot["verified_hash"] and blockchain.chain[verified_position].hash == snapshot["verified_hash"]:
+        blockchain.verified_height = verified_position
+        blockchain.verified_hash = snapshot["verified_hash"]
+    replayed = len(blockchain.chain) - 1 - blockchain.verified_height
+    blockchain.is_chain_valid()  # Incremental: checks only the blocks past the checkpoint
+    return replayed
+
+
+class SnapshotStore:
+    # The last KEEP_SNAPSHOTS snapshots in one JSON file, replaced atomically
+    def __init__(self, path="state_snapshots.json"):
+        self.path = path
+
+    def all(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as file:
+            return json.load(file)
+
+    def latest(self):
+        snapshots = self.all()
+        return snapshots[-1] if snapshots else None
+
+    def save(self, snapshot):
+        snapshots = (self.all() + [snapshot])[-KEEP_SNAPSHOTS:]
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(snapshots, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.path)  # A crash leaves either the old file or the new one
+
+    def restore_latest(self, blockchain):
+        # Newest snapshot that fits the loaded chain wins (older ones cover a reorged tip)
+        for snapshot in reversed(self.all()):
+            replayed = restore_snapshot(blockchain, snapshot)
+            if replayed is not None:
+                return snapshot, replayed
+        return None, None
@@ -46,6 +46,7 @@ if st.button("Mine New Block"):
         "transactions": latest_block.transactions,
         "validator": latest_block.validator,
         "hash": latest_block.hash,
+        "header_version": latest_block.header_version,
     })
     st.success(f"Block {latest_block.index} mined successfully!")
 
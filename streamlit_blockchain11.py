@@ -59,6 +59,7 @@ if st.button("Mine New Block"):
         "transactions": latest_block.transactions,
         "validator": latest_block.validator,
         "hash": latest_block.hash,
+        "header_version": latest_block.header_version,
     })
 
     blockchain.pending_transactions = []  # Clear pending transactions
@@ -1,13 +1,14 @@
 import streamlit as st
 from tinydb import TinyDB
 from simple_blockchain6 import Blockchain
+from block_log import BlockLog
 
 # ✅ Move this to the first line
 st.set_page_config(page_title="Blockchain Explorer", layout="wide")
 
 # Initialize Blockchain and TinyDB
 blockchain = Blockchain()
-db = TinyDB("blockchain.json")
+db = BlockLog("blockchain", legacy_json="blockchain.json")  # Imports an existing TinyDB ledger once
 validators_db = TinyDB("validators.json")
 users_db = TinyDB("users.json")
 
@@ -83,6 +84,7 @@ if st.button("Mine New Block"):
                 "transactions": latest_block.transactions,
                 "validator": latest_block.validator,
                 "hash": latest_block.hash,
+                "header_version": latest_block.header_version,
             })
 
             # Clear pending transactions
@@ -1,6 +1,7 @@
 import streamlit as st
 from tinydb import TinyDB
 from simple_blockchain6 import Blockchain
+from block_log import BlockLog
 
 # ✅ Ensure blockchain persists across interactions
 if "blockchain" not in st.session_state:
@@ -8,7 +9,7 @@ if "blockchain" not in st.session_state:
 
 blockchain = st.session_state.blockchain  # Use stored instance
 
-db = TinyDB("blockchain.json")
+db = BlockLog("blockchain", legacy_json="blockchain.json")  # Imports an existing TinyDB ledger once
 validators_db = TinyDB("validators.json")
 users_db = TinyDB("users.json")
 
@@ -76,6 +77,7 @@ if st.button("Mine New Block"):
                 "transactions": latest_block.transactions,
                 "validator": latest_block.validator,
                 "hash": latest_block.hash,
+                "header_version": latest_block.header_version,
             })
 
             blockchain.pending_transactions = []  # Clear transactions
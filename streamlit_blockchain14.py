@@ -1,47 +1,38 @@
 import streamlit as st
 from tinydb import TinyDB, Query
 from simple_blockchain6 import Blockchain, Block  # Add Block here
-
-
-# Initialize TinyDB databases
-db = TinyDB("blockchain.json")
+from block_log import BlockLog
+from cold_archive import ArchivedStore, ColdArchive
+from ledger_cache import LedgerCache
+from ledger_view import render_ledger
+from chain_persistence import load_blockchain, open_shared_blockchain, save_blockchain
+
+
+# Initialize the block log and TinyDB databases
+@st.cache_resource
+def open_block_log():
+    # One log per process, so rows still waiting in its group-commit buffer are
+    # visible to every session. Up to 16 blocks per write, flushed within 0.5 s,
+    # fsync at most every 200 ms, zlib-compressed records. Imports an existing
+    # TinyDB ledger once. Blocks older than the newest HOT_BLOCKS are sealed
+    # into compressed segment files under blockchain_archive/.
+    hot = BlockLog("blockchain", legacy_json="blockchain.json", batch_size=16, batch_window=0.5, sync="interval", sync_interval_ms=200,
+                   compression="zlib")
+    return ArchivedStore(hot, ColdArchive("blockchain_archive"))
+
+HOT_BLOCKS = 1000
+
+db = open_block_log()
+
+@st.cache_resource
+def open_ledger_cache():
+    return LedgerCache(db, "blockchain.log")
+
+ledger_cache = open_ledger_cache()
 validators_db = TinyDB("validators.json")
 users_db = TinyDB("users.json")
 
-# Load blockchain state from TinyDB
-def load_blockchain():
-    blockchain = Blockchain()
-    blocks = db.all()
-    if blocks:
-        for block in blocks:
-            blockchain.chain.append(Block(  # Change this line
-                index=block['index'],
-                previous_hash=block['previous_hash'],
-                timestamp=block['timestamp'],
-                transactions=block['transactions'],
-                validator=block['validator']
-            ))
-    return blockchain
-
-
-# Save blockchain state to TinyDB
-def save_blockchain(blockchain):
-    db.truncate()  # Clear existing blocks
-    for block in blockchain.chain:
-        db.insert({
-            "index": block.index,
-            "previous_hash": block.previous_hash,
-            "timestamp": block.timestamp,
-            "transactions": block.transactions,
-            "validator": block.validator,
-            "hash": block.hash
-        })
-
-# Ensure blockchain persists across interactions
-if "blockchain" not in st.session_state:
-    st.session_state.blockchain = load_blockchain()
-
-blockchain = st.session_state.blockchain  # Use stored instance
+blockchain, chain_lock = open_shared_blockchain("blockchain.log", lambda: load_blockchain(Blockchain, Block, db))
 
 st.set_page_config(page_title="Blockchain Explorer", layout="wide")
 
@@ -49,81 +40,82 @@ st.title("🛠️ Simple Blockchain Explorer v.14-6")
 
 # Display Blockchain Data
 st.subheader("📜 Blockchain Ledger")
-if db.all():
-    for block in db.all():
-        st.write(f"🔗 **Block {block['index']}**")
-        st.json(block)
-else:
-    st.info("No blocks added yet!")
+render_ledger(ledger_cache)
 
 # Add Transaction
 st.subheader("✉️ Add Transaction")
 transaction_input = st.text_area("Enter transaction data:")
 if st.button("Add Transaction"):
-    if transaction_input:
-        blockchain.create_transaction(transaction_input)
-        st.success("Transaction added!")
-        st.write("✅ Pending Transactions:", blockchain.pending_transactions)
-    else:
-        st.warning("Enter valid transaction data.")
+    with chain_lock:
+        if transaction_input:
+            blockchain.create_transaction(transaction_input)
+            st.success("Transaction added!")
+            st.write("✅ Pending Transactions:", blockchain.pending_transactions)
+        else:
+            st.warning("Enter valid transaction data.")
 
 # Stake Coins
 st.subheader("💰 Stake Coins")
 validator = st.text_input("Enter Validator Name:")
 amount = st.number_input("Enter Amount to Stake:", min_value=1, step=1)
 if st.button("Stake Coins"):
-    if validator and amount > 0:
-        blockchain.stake_coins(validator, amount)
-        st.success(f"{amount} coins staked by {validator}!")
-    else:
-        st.warning("Enter valid stake details.")
+    with chain_lock:
+        if validator and amount > 0:
+            blockchain.stake_coins(validator, amount)
+            st.success(f"{amount} coins staked by {validator}!")
+        else:
+            st.warning("Enter valid stake details.")
 
 # Mine Block
 st.subheader("⛏️ Mine Block")
 if st.button("Mine New Block"):
-    st.write("🛠️ Transactions Before Mining:", blockchain.pending_transactions)  # Debug print
+    with chain_lock:
+        st.write("🛠️ Transactions Before Mining:", blockchain.pending_transactions)  # Debug print
 
-    if not blockchain.pending_transactions:
-        st.warning("⚠️ No transactions to add to a new block! Add transactions first.")
-    else:
-        validator = blockchain.select_validator()
-
-        if not validator:
-            st.warning("⚠️ No validator available! Stake coins first.")
+        if not blockchain.pending_transactions:
+            st.warning("⚠️ No transactions to add to a new block! Add transactions first.")
         else:
-            # Ensure the block index is correct by checking the latest block in the database
-            latest_block_in_db = db.all()[-1] if db.all() else None
-            if latest_block_in_db and blockchain.get_latest_block().index != latest_block_in_db['index']:
-                st.error("⚠️ Blockchain state is out of sync! Please refresh the page.")
+            validator = blockchain.select_validator()
+
+            if not validator:
+                st.warning("⚠️ No validator available! Stake coins first.")
             else:
-                blockchain.add_block(validator)
-                latest_block = blockchain.get_latest_block()
-
-                st.write("✅ New Block Mined:", {
-                    "index": latest_block.index,
-                    "transactions": latest_block.transactions
-                })
-
-                # Save block to TinyDB
-                db.insert({
-                    "index": latest_block.index,
-                    "previous_hash": latest_block.previous_hash,
-                    "timestamp": latest_block.timestamp,
-                    "transactions": latest_block.transactions,
-                    "validator": latest_block.validator,
-                    "hash": latest_block.hash,
-                })
-
-                blockchain.pending_transactions = []  # Clear transactions
-                st.success(f"✅ Block {latest_block.index} mined successfully by {validator}!")
+                # Ensure the block index is correct by checking the latest block in the database
+                latest_block_in_db = db.last()
+                if latest_block_in_db and blockchain.get_latest_block().index != latest_block_in_db['index']:
+                    st.error("⚠️ Blockchain state is out of sync! Please refresh the page.")
+                else:
+                    blockchain.add_block(validator)
+                    latest_block = blockchain.get_latest_block()
+
+                    st.write("✅ New Block Mined:", {
+                        "index": latest_block.index,
+                        "transactions": latest_block.transactions
+                    })
+
+                    save_blockchain(db, blockchain)  # Appends only the blocks not yet persisted
+                    if blockchain.is_chain_valid():
+                        db.archive_old_blocks(keep=HOT_BLOCKS)  # No-op until a full segment has aged out
+
+                    blockchain.pending_transactions = []  # Clear transactions
+                    st.success(f"✅ Block {latest_block.index} mined successfully by {validator}!")
+
+with st.expander("💾 Block Log Writes"):
+    st.json(db.hot.flush_stats())
+    st.caption(f"{len(db.archive)} blocks archived in {len(db.archive.segments)} sealed segment(s)")
 
 # Run Blockchain Validity Check
 st.subheader("✅ Check Blockchain Validity")
+with chain_lock:  # Read both under the lock so they belong to the same chain
+    verified_index = blockchain.chain[blockchain.verified_height].index
+    tip_index = blockchain.get_latest_block().index
+st.caption(f"Stored hashes verified up to block {verified_index} of {tip_index}")
 if st.button("Validate Blockchain"):
-    if blockchain.is_chain_valid():
-        st.success("✅ Blockchain is valid!")
-    else:
-        st.error("❌ Blockchain is NOT valid!")
+    with chain_lock:
+        if blockchain.is_chain_valid():
+            st.success("✅ Blockchain is valid!")
+        else:
+            st.error("❌ Blockchain is NOT valid!")
 
 # Add Validator
 st.subheader("👤 Add Validator")
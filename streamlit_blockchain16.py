@@ -1,49 +1,41 @@
 import streamlit as st
 from tinydb import TinyDB, Query
 from simple_blockchain8 import Blockchain, Block  # ✅ Import Block explicitly
-
-# Initialize TinyDB databases
-db = TinyDB("blockchain.json")
+from sqlite_block_store import SQLiteBlockStore
+from ledger_cache import LedgerCache
+from ledger_view import render_ledger
+from chain_persistence import load_blockchain, open_shared_blockchain, save_blockchain
+from state_snapshot import SnapshotStore, take_snapshot
+from datetime import datetime, time as day_time
+
+# Initialize the SQLite block store and TinyDB databases
+@st.cache_resource
+def open_block_store():
+    # One store per process, shared by every session
+    return SQLiteBlockStore("blockchain.db", legacy_json="blockchain.json")  # Imports an existing TinyDB ledger once
+
+db = open_block_store()
+
+@st.cache_resource
+def open_ledger_cache():
+    return LedgerCache(db, "blockchain.db")
+
+ledger_cache = open_ledger_cache()
 validators_db = TinyDB("validators.json")
 users_db = TinyDB("users.json")
-
-# Load blockchain state from TinyDB
-def load_blockchain():
-    blockchain = Blockchain()
-    blocks = db.all()
-
-    if blocks:
-        blockchain.chain = []  # ✅ Clear default genesis block before loading from TinyDB
-        for block in blocks:
-            blockchain.chain.append(Block(
-                index=block['index'],
-                previous_hash=block['previous_hash'],
-                timestamp=block['timestamp'],
-                transactions=block['transactions'],
-                validator=block['validator']
-            ))
-
+snapshots = SnapshotStore("state_snapshots.json")  # Stakes and slash records, see load_with_snapshot
+SNAPSHOT_INTERVAL = 10  # Blocks between periodic snapshots
+SEARCH_PAGE_SIZE = 25  # Search results read and shown per page
+
+# Latest state snapshot + replay of the blocks above it, instead of starting empty
+def load_with_snapshot():
+    blockchain = load_blockchain(Blockchain, Block, db)
+    snapshot, replayed = snapshots.restore_latest(blockchain)
+    if snapshot:
+        print(f"Restored state at block {snapshot['height']}, replayed {replayed} block(s)")
     return blockchain
 
-
-# Save blockchain state to TinyDB
-def save_blockchain(blockchain):
-    db.truncate()  # Clear existing blocks
-    for block in blockchain.chain:
-        db.insert({
-            "index": block.index,
-            "previous_hash": block.previous_hash,
-            "timestamp": block.timestamp,
-            "transactions": block.transactions,
-            "validator": block.validator,
-            "hash": block.hash
-        })
-
-# Ensure blockchain persists across interactions
-if "blockchain" not in st.session_state:
-    st.session_state.blockchain = load_blockchain()
-
-blockchain = st.session_state.blockchain  # Use stored instance
+blockchain, chain_lock = open_shared_blockchain("blockchain.db", load_with_snapshot)
 
 st.set_page_config(page_title="Blockchain Explorer", layout="wide")
 
@@ -51,91 +43,127 @@ st.title("🛠️ Simple Blockchain Explorer v.16-8")
 
 # Display Blockchain Data
 st.subheader("📜 Blockchain Ledger")
-if db.all():
-    for block in db.all():
-        st.write(f"🔗 **Block {block['index']}**")
-        st.json(block)
+render_ledger(ledger_cache)
+
+def reset_search_page():
+    st.session_state.search_page = 1
+
+def show_search_results(count, fetch_page):
+    # Only the current page of matches is read from the store, as one table
+    if not count:
+        return
+    page_count = (count + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    if st.session_state.get("search_page", 1) > page_count:
+        st.session_state.search_page = page_count  # Fewer matches than when the page was picked
+    page = st.number_input("Results page:", min_value=1, max_value=page_count, step=1, key="search_page")
+    found = fetch_page(SEARCH_PAGE_SIZE, (page - 1) * SEARCH_PAGE_SIZE)
+    st.dataframe([{
+        "index": block["index"],
+        "time": datetime.fromtimestamp(block["timestamp"]),
+        "validator": block["validator"],
+        "transactions": len(block["transactions"]) if isinstance(block["transactions"], list) else 1,
+        "hash": block["hash"],
+        "previous hash": block["previous_hash"],
+    } for block in found], hide_index=True)
+    st.caption(f"Page {page} of {page_count}")
+
+# Search Blocks (indexed lookups in the SQLite store)
+st.subheader("🔍 Search Blocks")
+search_by = st.radio("Search by:", ["Hash", "Validator", "Time Range"], horizontal=True, on_change=reset_search_page)
+if search_by == "Hash":
+    search_hash = st.text_input("Block hash:")
+    if search_hash:
+        found = db.block_by_hash(search_hash.strip())
+        if found:
+            st.json(found)
+        else:
+            st.info("No block with that hash.")
+elif search_by == "Validator":
+    search_validator = st.text_input("Validator name:", on_change=reset_search_page).strip()
+    if search_validator:
+        count = db.count_by_validator(search_validator)
+        st.write(f"{count} block(s) produced by {search_validator}")
+        show_search_results(count, lambda limit, offset: db.blocks_by_validator(search_validator, limit, offset))
 else:
-    st.info("No blocks added yet!")
+    days = st.date_input("Date range:", value=(datetime.now().date(), datetime.now().date()), on_change=reset_search_page)
+    if len(days) == 2:
+        start = datetime.combine(days[0], day_time.min).timestamp()
+        end = datetime.combine(days[1], day_time.max).timestamp()
+        count = db.count_in_time_range(start, end)
+        st.write(f"{count} block(s) in range")
+        show_search_results(count, lambda limit, offset: db.blocks_in_time_range(start, end, limit, offset))
 
 # Add Transaction
 st.subheader("✉️ Add Transaction")
 transaction_input = st.text_area("Enter transaction data:")
 if st.button("Add Transaction"):
-    if transaction_input:
-        blockchain.create_transaction(transaction_input)
-        st.success("Transaction added!")
-        st.write("✅ Pending Transactions:", blockchain.pending_transactions)
-    else:
-        st.warning("Enter valid transaction data.")
+    with chain_lock:
+        if transaction_input:
+            blockchain.create_transaction(transaction_input)
+            st.success("Transaction added!")
+            st.write("✅ Pending Transactions:", blockchain.pending_transactions)
+        else:
+            st.warning("Enter valid transaction data.")
 
 # Stake Coins
 st.subheader("💰 Stake Coins")
 validator = st.text_input("Enter Validator Name:")
 amount = st.number_input("Enter Amount to Stake:", min_value=1, step=1)
 if st.button("Stake Coins"):
-    if validator and amount > 0:
-        blockchain.stake_coins(validator, amount)
-        st.success(f"{amount} coins staked by {validator}!")
-    else:
-        st.warning("Enter valid stake details.")
+    with chain_lock:
+        if validator and amount > 0:
+            blockchain.stake_coins(validator, amount)
+            snapshots.save(take_snapshot(blockchain))  # Stakes change outside blocks, so persist them now
+            st.success(f"{amount} coins staked by {validator}!")
+        else:
+            st.warning("Enter valid stake details.")
 
 # Mine Block
 st.subheader("⛏️ Mine Block")
 if st.button("Mine New Block"):
-    st.write("🛠️ Transactions Before Mining:", blockchain.pending_transactions)  # Debug print
-
-    if not blockchain.pending_transactions:
-        st.warning("⚠️ No transactions to add to a new block! Add transactions first.")
-    else:
-        validator = blockchain.select_validator()
+    with chain_lock:
+        st.write("🛠️ Transactions Before Mining:", blockchain.pending_transactions)  # Debug print
 
-        if not validator:
-            st.warning("⚠️ No validator available! Stake coins first.")
+        if not blockchain.pending_transactions:
+            st.warning("⚠️ No transactions to add to a new block! Add transactions first.")
         else:
-            # Ensure the block index is correct by checking the latest block in the database
-            latest_block_in_db = db.all()[-1] if db.all() else None
-            if latest_block_in_db and blockchain.get_latest_block().index != latest_block_in_db['index']:
-                st.error("⚠️ Blockchain state is out of sync! Please refresh the page.")
+            validator = blockchain.select_validator()
+
+            if not validator:
+                st.warning("⚠️ No validator available! Stake coins first.")
             else:
-                blockchain.add_block(validator)
-                latest_block = blockchain.get_latest_block()
-
-                st.write("✅ New Block Mined:", {
-                    "index": latest_block.index,
-                    "transactions": latest_block.transactions
-                })
-
-                # Save block to TinyDB
-                db.insert({
-                    "index": latest_block.index,
-                    "previous_hash": latest_block.previous_hash,
-                    "timestamp": latest_block.timestamp,
-                    "transactions": latest_block.transactions,
-                    "validator": latest_block.validator,
-                    "hash": latest_block.hash,
-                })
-
-                blockchain.pending_transactions = []  # Clear transactions
-                st.success(f"✅ Block {latest_block.index} mined successfully by {validator}!")
+                # Ensure the block index is correct by checking the latest block in the database
+                latest_block_in_db = db.last()
+                if latest_block_in_db and blockchain.get_latest_block().index != latest_block_in_db['index']:
+                    st.error("⚠️ Blockchain state is out of sync! Please refresh the page.")
+                else:
+                    blockchain.add_block(validator)
+                    latest_block = blockchain.get_latest_block()
+
+                    st.write("✅ New Block Mined:", {
+                        "index": latest_block.index,
+                        "transactions": latest_block.transactions
+                    })
+
+                    save_blockchain(db, blockchain)  # Appends only the blocks not yet persisted
+                    if latest_block.index % SNAPSHOT_INTERVAL == 0 and blockchain.is_chain_valid():
+                        snapshots.save(take_snapshot(blockchain))  # Moves the restart replay point up
+
+                    blockchain.pending_transactions = []  # Clear transactions
+                    st.success(f"✅ Block {latest_block.index} mined successfully by {validator}!")
 
 # Run Blockchain Validity Check
 st.subheader("✅ Check Blockchain Validity")
+with chain_lock:  # Read both under the lock so they belong to the same chain
+    verified_index = blockchain.chain[blockchain.verified_height].index
+    tip_index = blockchain.get_latest_block().index
+st.caption(f"Stored hashes verified up to block {verified_index} of {tip_index}")
 if st.button("Validate Blockchain"):
-    # Debugging: Print block hashes
-    for i in range(1, len(blockchain.chain)):
-        current_block = blockchain.chain[i]
-        previous_block = blockchain.chain[i - 1]
-        print(f"Checking Block {current_block.index}")
-        print(f"Stored Hash: {current_block.hash}")
-        print(f"Recalculated Hash: {current_block.calculate_hash()}")
-        print(f"Previous Hash: {current_block.previous_hash}")
-        print(f"Expected Previous Hash: {previous_block.hash}")
-
-    if blockchain.is_chain_valid():
-        st.success("✅ Blockchain is valid!")
-    else:
-        st.error("❌ Blockchain is NOT valid! Check logs for details.")
+    with chain_lock:
+        if blockchain.is_chain_valid():
+            st.success("✅ Blockchain is valid!")
+        else:
+            st.error("❌ Blockchain is NOT valid! Check logs for details.")
 
 # Add Validator
 st.subheader("👤 Add Validator")
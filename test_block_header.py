@@ -0,0 +1,65 @@
+import hashlib
+import time
+
+from block_header import hash_from_fields, pack_header, payload_digest
+from simple_blockchain6 import Block, Blockchain
+
+
+def make_block():
+    return Block(1, "ab" * 32, time.time(), ["User1: 'hello'", "User2: 'world'"], "Alice")
+
+
+def test_fresh_block_has_valid_hash():
+    assert make_block().has_valid_hash()
+
+
+def test_in_place_transaction_tampering_is_detected():
+    block = make_block()
+    block.calculate_hash()  # Warm the caches
+    block.transactions[0] = "TAMPERED"
+    assert not block.has_valid_hash()
+
+
+def test_reassigned_field_is_detected():
+    block = make_block()
+    block.validator = "Mallory"
+    assert block.hash != block.calculate_hash()
+    assert not block.has_valid_hash()
+
+
+def test_from_row_keeps_the_stored_hash():
+    block = make_block()
+    row = {"index": block.index, "previous_hash": block.previous_hash, "timestamp": block.timestamp,
+           "transactions": list(block.transactions), "validator": block.validator, "hash": block.hash,
+           "header_version": block.header_version}
+    restored = Block.from_row(row)
+    assert restored.has_valid_hash()
+    row["transactions"].append("injected")
+    assert not restored.has_valid_hash()
+
+
+def test_version_1_rows_still_verify():
+    # Saved before the payload digest became a Merkle root
+    block = make_block()
+    header = pack_header(block.index, block.timestamp, block.previous_hash, payload_digest(block.transactions, 1), block.validator, 0, 1)
+    row = {"index": block.index, "previous_hash": block.previous_hash, "timestamp": block.timestamp,
+           "transactions": block.transactions, "validator": block.validator,
+           "hash": hashlib.sha256(header).hexdigest(), "header_version": 1}
+    restored = Block.from_row(row)
+    assert restored.header_version == 1
+    assert restored.has_valid_hash()
+    assert hash_from_fields(restored.hash_fields()) == restored.hash
+    assert restored.merkle_root is None
+
+
+def test_inclusion_proofs_on_the_blockchain():
+    blockchain = Blockchain()
+    blockchain.stake_coins("Alice", 50)
+    for i in range(5):
+        blockchain.create_transaction(f"User{i}: 'post {i}'")
+    blockchain.validate_and_add_block()
+    block = blockchain.chain[1]
+    proof = blockchain.get_inclusion_proof(1, "User3: 'post 3'")
+    assert blockchain.verify_inclusion_proof("User3: 'post 3'", proof, block.merkle_root)
+    assert not blockchain.verify_inclusion_proof("User3: 'forged'", proof, block.merkle_root)
+    assert blockchain.get_inclusion_proof(1, "absent") is None
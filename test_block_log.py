@@ -0,0 +1,118 @@
+import json
+import os
+import struct
+
+from block_log import LEGACY_RECORD, MAGIC, BlockLog
+
+ROWS = [{"index": i, "previous_hash": str(i - 1), "transactions": [f"post {i}"], "hash": str(i)} for i in range(5)]
+
+
+def write_legacy_segment(path, rows):
+    # Segment as written before checksums: length-prefixed JSON, no MAGIC
+    with open(f"{path}.log", "wb") as file:
+        for row in rows:
+            body = json.dumps(row).encode()
+            file.write(LEGACY_RECORD.pack(len(body)) + body)
+
+
+def test_missing_index_is_rebuilt_for_a_legacy_segment(tmp_path):
+    path = str(tmp_path / "blockchain")
+    write_legacy_segment(path, ROWS)
+    log = BlockLog(path)
+    assert log.all() == ROWS
+    assert log.recovery["reindexed"] == len(ROWS) and log.recovery["truncated_bytes"] == 0
+    log.insert({"index": 5})
+    log.close()
+    assert BlockLog(path).all() == ROWS + [{"index": 5}]
+
+
+def test_missing_index_is_rebuilt_for_a_checksummed_segment(tmp_path):
+    path = str(tmp_path / "blockchain")
+    log = BlockLog(path)
+    log.insert_multiple(ROWS)
+    log.close()
+    os.remove(f"{path}.idx")
+    assert BlockLog(path).all() == ROWS
+
+
+def test_unpublished_legacy_records_are_reindexed(tmp_path):
+    path = str(tmp_path / "blockchain")
+    write_legacy_segment(path, ROWS[:3])
+    BlockLog(path).close()  # Index covers three records
+    write_legacy_segment(path, ROWS)  # Two more written, count never published
+    assert BlockLog(path).all() == ROWS
+
+
+def test_torn_magic_header_starts_a_fresh_log(tmp_path):
+    path = str(tmp_path / "blockchain")
+    with open(f"{path}.log", "wb") as file:
+        file.write(MAGIC[:3])
+    log = BlockLog(path)
+    log.insert_multiple(ROWS)
+    log.close()
+    with open(f"{path}.log", "rb") as file:
+        assert file.read(len(MAGIC)) == MAGIC
+    assert BlockLog(path).all() == ROWS
+
+
+def test_replace_all_swaps_the_whole_log(tmp_path):
+    path = str(tmp_path / "blockchain")
+    write_legacy_segment(path, ROWS)
+    log = BlockLog(path)
+    log.replace_all(ROWS[:2] + [{"index": 2, "fork": True}])
+    assert log.all() == ROWS[:2] + [{"index": 2, "fork": True}]
+    log.insert({"index": 3})
+    log.close()
+    assert not os.path.exists(f"{path}.log.tmp") and not os.path.exists(f"{path}.idx.tmp")
+    reopened = BlockLog(path)
+    assert reopened.all() == ROWS[:2] + [{"index": 2, "fork": True}, {"index": 3}]
+    assert reopened.recovery["reindexed"] == 0 and reopened.recovery["truncated_bytes"] == 0
+
+
+def test_height_of_follows_appends_and_rewrites(tmp_path):
+    log = BlockLog(str(tmp_path / "blockchain"))
+    log.insert_multiple(ROWS)
+    assert log.height_of("3") == 3
+    log.insert({"index": 5, "hash": "5"})
+    assert log.height_of("5") == 5
+    log.replace_all(ROWS[:2])
+    assert log.height_of("3") is None and log.height_of("1") == 1
+
+
+def test_hole_in_the_unsynced_batch_cuts_the_log_there(tmp_path):
+    path = str(tmp_path / "blockchain")
+    rows = [dict(ROWS[0], index=i) for i in range(10)]
+    log = BlockLog(path)
+    log.insert_multiple(rows[:2])
+    log.close()  # Synced up to here
+    log = BlockLog(path)
+    log.insert_multiple(rows[2:])  # Published, never synced
+    start, end = log._offset(8), log._offset(9)
+    with open(f"{path}.log", "rb") as file:
+        segment = file.read()
+    with open(f"{path}.idx", "rb") as file:
+        index = file.read()
+    log.close()
+    # The crash lost record 8 of the batch, but not the one after it
+    with open(f"{path}.log", "wb") as file:
+        file.write(segment[:start] + bytes(end - start) + segment[end:])
+    with open(f"{path}.idx", "wb") as file:
+        file.write(index)
+    recovered = BlockLog(path)
+    assert recovered.recovery["dropped"] == 2 and recovered.recovery["verified"] == 6
+    assert recovered.all() == rows[:8]
+    recovered.close()
+    assert BlockLog(path).recovery["verified"] == 0
+
+
+def test_index_without_synced_count_is_rebuilt(tmp_path):
+    path = str(tmp_path / "blockchain")
+    log = BlockLog(path)
+    log.insert_multiple(ROWS)
+    offsets = [log._offset(height) for height in range(len(ROWS))]
+    log.close()
+    with open(f"{path}.idx", "wb") as file:  # Header as written before INDEX_MAGIC: the count alone
+        file.write(struct.pack(">Q", len(ROWS)) + b"".join(struct.pack(">Q", offset) for offset in offsets))
+    log = BlockLog(path)
+    assert log.recovery["reindexed"] == log.recovery["verified"] == len(ROWS)
+    assert log.all() == ROWS
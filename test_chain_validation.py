@@ -0,0 +1,49 @@
+import time
+
+import simple_blockchain1
+import simple_blockchain6
+from pow_mining import difficulty_to_target, target_to_bits
+
+
+def pos_chain():
+    blockchain = simple_blockchain6.Blockchain()
+    blockchain.stake_coins("Alice", 50)
+    for i in range(3):
+        blockchain.create_transaction(f"User{i}: 'post {i}'")
+        blockchain.validate_and_add_block()
+    return blockchain
+
+
+def pow_chain():
+    blockchain = simple_blockchain1.Blockchain(difficulty=2)
+    for i in range(3):
+        blockchain.add_block(simple_blockchain1.Block(len(blockchain.chain), "", time.time(), [f"User{i}: 'post {i}'"]))
+    return blockchain
+
+
+def test_incremental_check_detects_in_place_tampering():
+    for blockchain in (pos_chain(), pow_chain()):
+        assert blockchain.is_chain_valid()
+        blockchain.verified_height = 0
+        getattr(blockchain.chain[1], blockchain.chain[1].payload_field)[0] = "TAMPERED"
+        assert not blockchain.is_chain_valid()
+
+
+def test_blocks_at_or_below_the_checkpoint_are_not_rechecked():
+    blockchain = pos_chain()
+    assert blockchain.is_chain_valid()
+    blockchain.chain[1].transactions[0] = "TAMPERED"
+    assert blockchain.is_chain_valid()  # Trusted checkpoint...
+    assert not blockchain.is_chain_valid(full=True)  # ...until a full re-audit
+
+
+def test_pow_target_rule_applies_to_incremental_and_sharded_audits(capsys):
+    blockchain = pow_chain()
+    tip = blockchain.chain[-1]
+    tip.bits = target_to_bits(difficulty_to_target(1))  # Easier than the chain allows, then re-mined
+    tip.nonce = 0
+    tip.mine_block()
+    assert tip.has_valid_hash()
+    assert not blockchain.is_chain_valid()
+    assert not blockchain.is_chain_valid(full=True, workers=2)
+    assert capsys.readouterr().out.count("Block target is invalid!") == 2
@@ -0,0 +1,55 @@
+import threading
+
+from block_log import BlockLog
+from cold_archive import SEGMENT_BLOCKS, ArchivedStore, ColdArchive
+
+
+def make_rows(count):
+    return [{"index": i, "previous_hash": str(i - 1), "hash": str(i), "transactions": [f"post {i}"]} for i in range(count)]
+
+
+def open_store(tmp_path):
+    return ArchivedStore(BlockLog(str(tmp_path / "blockchain")), ColdArchive(str(tmp_path / "archive")))
+
+
+def test_archive_old_blocks_keeps_every_block(tmp_path):
+    rows = make_rows(2 * SEGMENT_BLOCKS + 100)
+    store = open_store(tmp_path)
+    store.insert_multiple(rows)
+    assert store.archive_old_blocks(keep=50) == 2 * SEGMENT_BLOCKS
+    assert len(store.hot) == 100 and store.all() == rows
+    store.hot.close()
+    reopened = open_store(tmp_path)
+    assert reopened.all() == rows and not reopened.broken_links()
+
+
+def test_concurrent_archiving_seals_each_range_once(tmp_path):
+    rows = make_rows(SEGMENT_BLOCKS + 10)
+    store = open_store(tmp_path)
+    store.insert_multiple(rows)
+    threads = [threading.Thread(target=store.archive_old_blocks, args=(5,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store.archive.segments) == 1
+    assert store.all() == rows
+
+
+def test_insert_multiple_returns_ids_of_inserted_rows(tmp_path):
+    rows = make_rows(SEGMENT_BLOCKS + 10)
+    store = open_store(tmp_path)
+    assert store.insert_multiple(rows) == list(range(1, len(rows) + 1))
+    store.archive_old_blocks(keep=5)
+    # Already sealed rows are dropped; only the new one gets an id
+    assert store.insert_multiple(rows[:3] + make_rows(len(rows) + 1)[-1:]) == [len(rows) + 1]
+
+
+def test_height_of_spans_archive_and_hot_store(tmp_path):
+    rows = make_rows(SEGMENT_BLOCKS + 10)
+    store = open_store(tmp_path)
+    store.insert_multiple(rows)
+    store.archive_old_blocks(keep=5)
+    assert store.height_of("3") == 3
+    assert store.height_of(str(SEGMENT_BLOCKS + 4)) == SEGMENT_BLOCKS + 4
+    assert store.height_of("missing") is None
@@ -0,0 +1,34 @@
+import hashlib
+import random
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import numpy_mining
+from block_header import HEADER_SIZE, NONCE_SIZE, pack_header, payload_digest
+from pow_mining import difficulty_to_target, mine as hashlib_mine
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_sha256_batch_matches_hashlib(seed):
+    # Prefix lengths that cross block and padding boundaries, nonces that carry across bytes
+    rng = random.Random(seed)
+    prefix = rng.randbytes(rng.choice([0, HEADER_SIZE - NONCE_SIZE, rng.randint(0, 300)]))
+    start = rng.choice([0, 250, 65_530, rng.randint(0, 2 ** 63)])
+    nonces = range(start, start + rng.randint(1, 40))
+    expected = [hashlib.sha256(prefix + nonce.to_bytes(NONCE_SIZE, 'big')).hexdigest() for nonce in nonces]
+    assert numpy_mining.sha256_batch(prefix, nonces) == expected
+
+
+def test_block_header_hash_matches_hashlib():
+    # Full block headers, as hashed by BaseBlock.calculate_hash
+    header = pack_header(7, time.time(), "ab" * 32, payload_digest(["post"]), "", 123_456)
+    assert numpy_mining.sha256_batch(header[:-NONCE_SIZE], range(123_456, 123_457)) == [hashlib.sha256(header).hexdigest()]
+
+
+def test_mine_finds_the_same_nonce_as_hashlib():
+    prefix = pack_header(1, time.time(), "0" * 64, payload_digest(["User1: post"]), "")[:-NONCE_SIZE]
+    target = difficulty_to_target(3)
+    assert numpy_mining.mine(prefix, target)[:2] == hashlib_mine(prefix, target)[:2]
@@ -0,0 +1,35 @@
+import random
+import threading
+import time
+
+from block_log import BlockLog
+from paged_chain import PagedChain
+from simple_blockchain6 import Block
+
+
+def test_concurrent_reads_keep_the_cache_consistent(tmp_path):
+    log = BlockLog(str(tmp_path / "blockchain"))
+    previous_hash = "0"
+    for i in range(500):
+        block = Block(i, previous_hash, time.time(), [f"post {i}"], "Alice")
+        log.insert({"index": i, "previous_hash": previous_hash, "timestamp": block.timestamp, "transactions": block.transactions,
+                    "validator": block.validator, "hash": block.hash, "header_version": block.header_version})
+        previous_hash = block.hash
+    chain = PagedChain(Block, log, resident=8, cache_size=16)
+    errors = []
+
+    def read():
+        try:
+            for _ in range(500):
+                height = random.randrange(len(chain))
+                assert chain[height].index == height
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(chain._cache) <= 16
@@ -0,0 +1,84 @@
+import hashlib
+import time
+from fractions import Fraction
+
+import pytest
+
+import simple_blockchain1
+from pow_mining import NONCE_SIZE, bits_to_target, difficulty_to_target, parallel_mine, retarget_bits, target_to_bits
+
+PREFIX = b"block header without its nonce"
+
+
+def test_parallel_mine_finds_a_valid_nonce():
+    nonce, block_hash, hashes, _ = parallel_mine(PREFIX, difficulty_to_target(3), workers=2)
+    assert hashlib.sha256(PREFIX + nonce.to_bytes(NONCE_SIZE, 'big')).hexdigest() == block_hash
+    assert block_hash.startswith("000") and hashes > 0
+
+
+def test_parallel_mine_raises_when_a_worker_dies():
+    # The crash comes from the worker's own arguments (a prefix hashlib rejects),
+    # so it happens under every start method, fork, spawn or forkserver
+    with pytest.raises(RuntimeError):
+        parallel_mine(None, difficulty_to_target(3), workers=2)
+
+
+def test_parallel_mine_times_out():
+    with pytest.raises(TimeoutError):
+        parallel_mine(PREFIX, -1, workers=2, timeout=1)  # A negative target never matches
+
+
+def test_parallel_mine_with_numpy_backend():
+    pytest.importorskip("numpy")
+    nonce, block_hash, _, _ = parallel_mine(PREFIX, difficulty_to_target(3), workers=2, backend="numpy")
+    assert hashlib.sha256(PREFIX + nonce.to_bytes(NONCE_SIZE, 'big')).hexdigest() == block_hash
+
+
+def test_parallel_mine_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        parallel_mine(PREFIX, difficulty_to_target(3), workers=2, backend="gpu")
+
+
+@pytest.mark.parametrize("difficulty", range(1, 20))
+def test_difficulty_targets_round_trip_through_bits(difficulty):
+    # 3-byte mantissa: the round trip keeps the top bits and never raises the target
+    target = difficulty_to_target(difficulty)
+    round_trip = bits_to_target(target_to_bits(target))
+    assert round_trip <= target and target - round_trip < target >> 15
+
+
+@pytest.mark.parametrize("bits", [0x1d00ffff, 0x1f3fffc0, 0x2000ffff, 0x03123456, 0x1b0404cb])
+def test_canonical_bits_round_trip(bits):
+    assert target_to_bits(bits_to_target(bits)) == bits
+
+
+@pytest.mark.parametrize("actual, expected, factor", [
+    (0.0005, 0.002, Fraction(1, 4)),  # Sub-millisecond windows are not rounded to zero
+    (0.0001, 0.002, Fraction(1, 4)),  # Clamped to 4x harder
+    (1.0, 0.002, Fraction(4)),  # Clamped to 4x easier
+    (3.0, 2.0, Fraction(3, 2)),
+])
+def test_retarget_scales_exactly_within_the_clamp(actual, expected, factor):
+    bits = 0x1f3fffc0
+    target = bits_to_target(bits)
+    new_target = bits_to_target(retarget_bits(bits, actual, expected))
+    exact = target * factor.numerator // factor.denominator
+    assert exact - (exact >> 15) <= new_target <= exact
+
+
+def test_retarget_rejects_a_non_positive_expected_timespan():
+    with pytest.raises(ValueError):
+        retarget_bits(0x1f3fffc0, 1.0, 0)
+
+
+def test_blockchain_rejects_a_non_positive_block_interval():
+    with pytest.raises(ValueError):
+        simple_blockchain1.Blockchain(difficulty=2, block_interval=0)
+
+
+def test_fast_blocks_keep_a_mineable_target():
+    blockchain = simple_blockchain1.Blockchain(difficulty=2, block_interval=0.001, retarget_interval=3)
+    for i in range(7):
+        blockchain.add_block(simple_blockchain1.Block(len(blockchain.chain), "", time.time(), [f"post {i}"]))
+    assert blockchain.is_chain_valid()
+    assert all(bits_to_target(block.bits) >= difficulty_to_target(2) // 4 ** 3 for block in blockchain.chain)
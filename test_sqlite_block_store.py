@@ -0,0 +1,27 @@
+from sqlite_block_store import SQLiteBlockStore
+
+
+def make_rows(count):
+    return [{"index": i, "previous_hash": str(i - 1), "timestamp": float(i), "validator": "Alice" if i % 2 else "Bob",
+             "hash": str(i), "header_version": 2, "transactions": [f"post {i}", f"like {i}"]} for i in range(count)]
+
+
+def test_search_pages_match_the_full_result(tmp_path):
+    rows = make_rows(50)
+    store = SQLiteBlockStore(str(tmp_path / "blockchain.db"))
+    store.insert_multiple(rows)
+    alice = [row for row in rows if row["validator"] == "Alice"]
+    assert store.count_by_validator("Alice") == len(alice) == 25
+    assert store.blocks_by_validator("Alice") == alice
+    pages = [store.blocks_by_validator("Alice", 10, offset) for offset in range(0, 30, 10)]
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == alice  # Each page carries its own blocks' transactions
+
+
+def test_time_range_pages(tmp_path):
+    rows = make_rows(50)
+    store = SQLiteBlockStore(str(tmp_path / "blockchain.db"))
+    store.insert_multiple(rows)
+    assert store.count_in_time_range(10, 30) == 20
+    assert store.blocks_in_time_range(10, 30, 5, 15) == rows[25:30]
+    assert store.blocks_in_time_range(10, 30, 5, 20) == []